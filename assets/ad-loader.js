@@ -1,19 +1,26 @@
+// Ads are inlined into pages at build time (rebuild_index.py). This loader is
+// only a fallback for placeholders that are still empty, e.g. pages built
+// before a slot was added to config/ads.json.
 document.addEventListener('DOMContentLoaded', () => {
+  const empty = [...document.querySelectorAll('.ad-slot')].filter((el) => !el.innerHTML.trim());
+  if (!empty.length) return;
   const BASE = (document.querySelector('meta[name="site-base"]')?.content || '').replace(/\/$/, '');
-  const url = (BASE ? BASE : '') + '/config/ads.json?v=' + Date.now();
-  fetch(url, { cache: 'no-store' })
+  const url = (BASE ? BASE : '') + '/config/ads.json';
+  // 'no-cache' revalidates via ETag (a cheap 304) instead of a fresh download per view
+  fetch(url, { cache: 'no-cache' })
     .then((res) => res.json())
     .then((config) => {
       if (!config || config.enabled === false) return;
       const slots = config.slots || {};
-      Object.entries(slots).forEach(([slot, html]) => {
-        document.querySelectorAll(`.ad-slot[data-ad="${slot}"]`).forEach((el) => {
+      empty.forEach((el) => {
+        const html = slots[el.dataset.ad];
+        if (html) {
           el.innerHTML = html;
           el.dataset.loaded = '1';
-        });
+        }
       });
     })
     .catch((err) => {
       console.error('Ad loader error:', err);
     });
-});
\ No newline at end of file
+});
@@ -3,19 +3,62 @@
   const input = document.getElementById('q');
   const results = document.getElementById('results');
   if (!input || !results) return;
-  const data = await fetch(BASE + '/feeds/search.json', {cache:'no-store'}).then(r=>r.json()).catch(()=>[]);
-  input.addEventListener('input', () => {
-    const q = input.value.trim().toLowerCase();
+  // Index layout: see writer/search_index.py. Only meta.json is loaded up front;
+  // term shards and doc chunks are fetched lazily and cached.
+  const DIR = BASE + '/feeds/search/';
+  const meta = await fetch(DIR + 'meta.json').then(r=>r.json()).catch(()=>null);
+  if (!meta) return;
+  const known = new Set(meta.shards || []);
+  const cache = new Map();
+  const load = (file) => {
+    if (!cache.has(file)) cache.set(file, fetch(DIR + file).then(r=>r.json()).catch(()=>null));
+    return cache.get(file);
+  };
+  const tokenize = (s) => (s.toLowerCase().match(/[\p{L}\p{N}]+/gu) || []).filter(t => Array.from(t).length >= meta.prefix);
+  const shardName = (t) => {
+    const prefix = Array.from(t).slice(0, meta.prefix).join('');
+    if (/^[a-z0-9]+$/.test(prefix)) return prefix;
+    return 'x' + Array.from(new TextEncoder().encode(prefix), b => b.toString(16).padStart(2, '0')).join('');
+  };
+  const escapeHtml = (s) => String(s || '').replace(/[&<>"']/g, c => ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[c]));
+
+  // ids of posts having a term that starts with token
+  async function lookup(token) {
+    const name = shardName(token);
+    if (!known.has(name)) return new Set();
+    const shard = await load('t-' + name + '.json') || {};
+    const ids = new Set();
+    for (const [term, deltas] of Object.entries(shard)) {
+      if (!term.startsWith(token)) continue;
+      let id = 0;
+      for (const d of deltas) { id += d; ids.add(id); }
+    }
+    return ids;
+  }
+
+  let seq = 0;
+  input.addEventListener('input', async () => {
+    const run = ++seq;
+    const tokens = tokenize(input.value.trim());
+    if (!tokens.length) { results.innerHTML=''; return; }
+    let hits = null;
+    for (const set of await Promise.all(tokens.map(lookup))) {
+      hits = hits === null ? set : new Set([...hits].filter(id => set.has(id)));
+    }
+    const top = [...hits].sort((a, b) => b - a).slice(0,20);  // newest first
+    const chunks = await Promise.all([...new Set(top.map(id => Math.floor(id / meta.chunk)))]
+      .map(async n => [n, await load('docs-' + n + '.json') || []]));
+    if (run !== seq) return;
+    const rows = new Map(chunks);
     results.innerHTML='';
-    if (!q) return;
-    const hits = data
-      .filter(p => ((p.title||'').toLowerCase().includes(q) || (p.description||'').toLowerCase().includes(q)))
-      .slice(0,20);
-    hits.forEach(p => {
+    top.forEach(id => {
+      const p = (rows.get(Math.floor(id / meta.chunk)) || [])[id % meta.chunk];
+      if (!p) return;
+      const [title, url, date, description] = p;
       const el = document.createElement('div');
       el.className='article-card';
-      el.innerHTML = `<a href="${BASE + p.url}"><strong>${p.title}</strong></a><div class="meta">${p.date}</div><p>${p.description||''}</p>`;
+      el.innerHTML = `<a href="${escapeHtml(BASE + url)}"><strong>${escapeHtml(title)}</strong></a><div class="meta">${escapeHtml(date)}</div><p>${escapeHtml(description)}</p>`;
       results.appendChild(el);
     });
   });
-})();
\ No newline at end of file
+})();
@@ -0,0 +1,56 @@
+"""Duplicate-check lookup latency as the archive grows: LSH index vs. a linear scan.
+
+Usage: python bench/bench_dedupe.py [--posts 1000 5000 20000] [--queries 200]
+"""
+import argparse, sys, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from writer.dedupe import SignatureIndex, signature, similarity  # noqa: E402
+from bench.synth import synthetic_article  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, nargs="+", default=[1_000, 5_000, 20_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    sigs = [signature(synthetic_article(args.words, seed=i, faq=0)) for i in range(max(args.posts))]
+    print(f"signed {len(sigs)} articles in {time.perf_counter() - t0:.1f}s")
+
+    # queries: half are light edits of archived articles, half are new text
+    queries = []
+    for q in range(args.queries):
+        text = synthetic_article(args.words, seed=(q * 7919) % len(sigs) if q % 2 else 10_000_000 + q, faq=0)
+        if q % 2:
+            text = text.replace("luggage", "bag", 3)
+        queries.append(signature(text))
+
+    print(f"{'posts':>8}  {'index s':>8} {'lsh µs':>9} {'scan µs':>9}  {'hits lsh/scan':>13}")
+    for n in args.posts:
+        index = SignatureIndex()
+        t0 = time.perf_counter()
+        for i, sig in enumerate(sigs[:n]):
+            index.add(f"/p/{i}", sig, flush=False)
+        len(index)  # build the LSH buckets
+        build_dt = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        lsh_hits = sum(bool(index.query(sig, args.threshold)) for sig in queries)
+        lsh_dt = (time.perf_counter() - t0) / len(queries)
+
+        t0 = time.perf_counter()
+        scan_hits = sum(any(similarity(sig, other) >= args.threshold for other in sigs[:n]) for sig in queries)
+        scan_dt = (time.perf_counter() - t0) / len(queries)
+
+        print(f"{n:>8}  {build_dt:>8.2f} {lsh_dt * 1e6:>9.0f} {scan_dt * 1e6:>9.0f}  {lsh_hits:>6}/{scan_hits:<6}")
+
+
+if __name__ == "__main__":
+    main()
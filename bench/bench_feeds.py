@@ -0,0 +1,63 @@
+"""RSS fetch wall time under slow feeds: the fetch deadline must bound the whole run.
+
+Runs fetch_news_from_rss() against bench/fake_feeds.py for a few scenarios
+(healthy, one feed slow to answer, one feed dripping its body, one feed
+failing) and prints wall time, the headline picked and how many feeds were
+fetched fresh. A run that takes longer than --deadline plus a small margin,
+or leaves non-daemon threads behind (the interpreter would wait for them on
+exit), is reported and the script exits with status 1.
+
+Usage: python bench/bench_feeds.py [--deadline 1.0] [--timeout 0.5]
+"""
+import argparse, contextlib, io, sys, tempfile, threading, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from bench.fake_feeds import serve  # noqa: E402
+from writer.seen import SeenEntries  # noqa: E402
+from writer.storage import fetch_news_from_rss  # noqa: E402
+
+MARGIN = 0.5  # запуск потоков, разбор лент, запись кэша
+
+SCENARIOS = {
+    "healthy": {"*": {"delay": 0.05}},
+    "one feed slow (10s)": {"*": {"delay": 0.05}, "slow": {"delay": 10}},
+    "one feed drips its body": {"*": {"delay": 0.05}, "slow": {"drip": 0.4}},
+    "one feed fails (503)": {"*": {"delay": 0.05}, "slow": {"status": 503}},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deadline", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=0.5, help="Per-read socket timeout")
+    args = parser.parse_args()
+
+    server, urls = serve()
+    late = []
+    print(f"{'scenario':<26} {'seconds':>8}  {'fresh':>5}  headline")
+    for name, behaviour in SCENARIOS.items():
+        server.behaviour = behaviour
+        with tempfile.TemporaryDirectory(prefix="bench-feeds-") as root:
+            configs = {"root": root, "feeds": urls, "seen": SeenEntries(),
+                       "feeds_fetch": {"timeout": args.timeout, "deadline": args.deadline, "workers": 8}}
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()) as log:
+                title, _ = fetch_news_from_rss(configs)
+            dt = time.perf_counter() - t0
+        fresh = len(urls) - log.getvalue().count("⚠️")
+        lingering = [t for t in threading.enumerate() if not t.daemon and t is not threading.main_thread()]
+        flag = ""
+        if dt > args.deadline + MARGIN or lingering:
+            flag = "  ❌ over the deadline" if not lingering else f"  ❌ {len(lingering)} threads block exit"
+            late.append(name)
+        print(f"{name:<26} {dt:>8.2f}  {fresh:>5}  {title}{flag}")
+    server.shutdown()
+    if late:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
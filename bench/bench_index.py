@@ -0,0 +1,58 @@
+"""Pages/second for the index and tag page writers on a synthetic corpus.
+
+Usage: python bench/bench_index.py [--posts 10000 100000] [--jobs 1 4]
+"""
+import argparse, shutil, sys, tempfile, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+import rebuild_index  # noqa: E402
+from writer.poststore import PostStore  # noqa: E402
+from bench.synth import synthetic_posts  # noqa: E402
+
+
+def run(n, jobs):
+    rebuild_index.load_site(REPO)
+    tmp = Path(tempfile.mkdtemp(prefix="bench-index-"))
+    try:
+        shutil.copy(REPO / "index.html", tmp / "index.html")
+        rebuild_index.ROOT = tmp
+        rebuild_index.STORE = PostStore(posts=synthetic_posts(n))
+        rebuild_index.FULL_REBUILD = True
+        rebuild_index.JOBS = jobs
+        rebuild_index.TEMPLATES.clear()
+        results = []
+        for stage in (rebuild_index.build_main_and_pages, rebuild_index.build_tags):
+            before = len(rebuild_index.REPORT["written"])
+            t0 = time.perf_counter()
+            stage()
+            dt = time.perf_counter() - t0
+            pages = len(rebuild_index.REPORT["written"]) - before
+            results.append((stage.__name__, pages, dt))
+        return results
+    finally:
+        rebuild_index.close_pool()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1])
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.posts:
+        for jobs in args.jobs:
+            for name, pages, dt in run(n, jobs):
+                rows.append((n, jobs, name, pages, dt))
+    print()
+    print(f"{'posts':>8} {'jobs':>4}  {'stage':<22} {'files':>7} {'seconds':>8} {'pages/s':>9}")
+    for n, jobs, name, pages, dt in rows:
+        print(f"{n:>8} {jobs:>4}  {name:<22} {pages:>7} {dt:>8.2f} {pages / dt:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""LLM call latency under injected faults: hedged/streamed calls vs. waiting on one model.
+
+Runs call_openai() against bench/fake_llm.py for a few scenarios (slow primary,
+overloaded endpoint, stream that hangs mid-answer, primary rejecting the
+request) with and without hedging, and prints wall time, the model that
+answered and the requests made.
+
+Usage: python bench/bench_llm.py [--hedge-after 1.0] [--idle-timeout 1.0]
+"""
+import argparse, contextlib, io, os, sys, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from bench.fake_llm import serve  # noqa: E402
+
+PRIMARY, FALLBACK = "gpt-5-mini", "gpt-5"
+
+SCENARIOS = {
+    "healthy": {PRIMARY: {"delay": 0.2}, FALLBACK: {"delay": 0.2}},
+    "slow primary (5s)": {PRIMARY: {"delay": 5}, FALLBACK: {"delay": 0.3}},
+    "both overloaded once": {PRIMARY: {"fail": 1, "delay": 0.2}, FALLBACK: {"fail": 1, "delay": 0.2}},
+    "primary hangs mid-stream": {PRIMARY: {"hang_after": 2}, FALLBACK: {"delay": 0.3}},
+    "primary rejects (404)": {PRIMARY: {"fail": 99, "status": 404}, FALLBACK: {"delay": 0.3}},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hedge-after", type=float, default=1.0)
+    parser.add_argument("--idle-timeout", type=float, default=1.0)
+    parser.add_argument("--deadline", type=float, default=10.0)
+    args = parser.parse_args()
+
+    server, url = serve()
+    os.environ["OPENAI_BASE_URL"] = url
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    from writer.llm import call_openai, get_client  # noqa: E402
+    get_client()  # импорт openai и создание клиента — не часть задержки вызова
+
+    llm = {"deadline": args.deadline, "idle_timeout": args.idle_timeout, "retries": 2, "backoff": 0.2, "backoff_max": 1}
+    modes = {
+        "hedged": {**llm, "hedge_after": args.hedge_after},
+        "single model": {**llm, "hedge_after": None},
+    }
+    print(f"{'scenario':<26} {'mode':<13} {'seconds':>8}  {'answered by':<12} requests")
+    for name, behaviour in SCENARIOS.items():
+        for mode, opts in modes.items():
+            configs = {"no_cache": True, "writer_config": {"model": PRIMARY, "llm": opts,
+                                                           "fallbackModel": FALLBACK if mode == "hedged" else None}}
+            server.behaviour = {model: dict(rule) for model, rule in behaviour.items()}
+            server.calls = []
+            t0 = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    text = call_openai(f"Primary keyword: {name}", "system", configs)
+                answered = text.split("(written by ", 1)[1].split(")", 1)[0] if text else "empty"
+            except Exception as e:
+                answered = type(e).__name__
+            dt = time.perf_counter() - t0
+            print(f"{name:<26} {mode:<13} {dt:>8.2f}  {answered:<12} {', '.join(server.calls)}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
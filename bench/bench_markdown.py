@@ -0,0 +1,47 @@
+"""Throughput of the single-pass Markdown converter on large articles.
+
+Compares writer.markdown.convert() (HTML + description + word count in one
+pass) with the original md_to_html + plain_text + \\w+ count passes.
+
+Usage: python bench/bench_markdown.py [--words 2000 20000] [--n 200]
+"""
+import argparse, re, sys, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from writer.markdown import convert  # noqa: E402
+from bench.synth import synthetic_article  # noqa: E402
+from bench.bench_render import legacy_md_to_html, legacy_plain_text  # noqa: E402
+
+
+def legacy(md):
+    return legacy_md_to_html(md), legacy_plain_text(md)[:160], len(re.findall(r"\w+", md))
+
+
+def bench(fn, md, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn(md)
+    dt = time.perf_counter() - t0
+    return n / dt, len(md.encode("utf-8")) * n / dt / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, nargs="+", default=[2000, 20000])
+    parser.add_argument("--n", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'words':>7}  {'impl':<8} {'docs/s':>9} {'MB/s':>7}")
+    for words in args.words:
+        md = synthetic_article(words)
+        n = max(1, args.n * 2000 // words)
+        for name, fn in (("legacy", legacy), ("convert", lambda s: convert(s, desc_len=160))):
+            docs, mbs = bench(fn, md, n)
+            print(f"{words:>7}  {name:<8} {docs:>9.1f} {mbs:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Related-posts computation: full pass vs. incremental update after new posts.
+
+Usage: python bench/bench_related.py [--posts 20000] [--new 20]
+"""
+import argparse, sys, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from writer.related import update_related  # noqa: E402
+from bench.synth import synthetic_posts  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=20_000)
+    parser.add_argument("--new", type=int, default=20)
+    args = parser.parse_args()
+
+    posts = synthetic_posts(args.posts, tags=30)
+    old = posts[args.new:]  # newest first: the first --new posts arrive later
+
+    t0 = time.perf_counter()
+    data, _ = update_related(old, {})
+    full_dt = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    data, changed = update_related(posts, data)
+    inc_dt = time.perf_counter() - t0
+
+    fresh, _ = update_related(posts, {})
+    same = sum(
+        len({e[0] for e in data["related"][url]} & {e[0] for e in entries})
+        for url, entries in fresh["related"].items()
+    )
+    total = sum(len(entries) for entries in fresh["related"].values()) or 1
+
+    print(f"full pass      {len(old):>7} posts  {full_dt:6.2f}s")
+    print(f"incremental    +{args.new:<6} posts  {inc_dt:6.2f}s  ({len(changed)} lists changed)")
+    print(f"agreement with a fresh full pass: {same / total:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Renders/second for render_post_html vs. the original read-and-replace implementation.
+
+Usage: python bench/bench_render.py [--n 2000] [--words 1500]
+"""
+import argparse, re, sys, time
+from datetime import datetime
+from html import escape
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from writer.config import load_configs  # noqa: E402
+from writer.faq import extract_faq  # noqa: E402
+from writer.render import render_post_html  # noqa: E402
+from bench.synth import synthetic_article  # noqa: E402
+
+
+def legacy_md_to_html(md: str) -> str:
+    """The original line-filtering converter (no escaping, #/##/- only)."""
+    lines = [l.rstrip() for l in md.strip().splitlines() if l.strip()]
+    html_lines, in_ul = [], False
+    for ln in lines:
+        if ln.startswith("# "):
+            if in_ul: html_lines.append("</ul>"); in_ul = False
+            html_lines.append(f"<h2>{ln[2:].strip()}</h2>")
+        elif ln.startswith("## "):
+            if in_ul: html_lines.append("</ul>"); in_ul = False
+            html_lines.append(f"<h3>{ln[3:].strip()}</h3>")
+        elif ln.startswith("- "):
+            if not in_ul: html_lines.append("<ul>"); in_ul = True
+            html_lines.append(f"<li>{ln[2:].strip()}</li>")
+        else:
+            if in_ul: html_lines.append("</ul>"); in_ul = False
+            html_lines.append(f"<p>{ln}</p>")
+    if in_ul: html_lines.append("</ul>")
+    return "\n".join(html_lines)
+
+
+def legacy_plain_text(s: str) -> str:
+    s = re.sub(r"^#\s+", "", s, flags=re.M)
+    s = re.sub(r"^-\s+", "", s, flags=re.M)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+def legacy_render_post_html(title, body_md, faq_html, faq_jsonld, configs, *, slug, published_at=None):
+    """The pre-template-cache renderer: reread templates, chained str.replace passes."""
+    ROOT = configs["root"]
+    with open(f"{ROOT}/templates/layout.html", encoding="utf-8") as f:
+        layout = f.read()
+    with open(f"{ROOT}/templates/post.html", encoding="utf-8") as f:
+        post_tpl = f.read()
+    with open(f"{ROOT}/templates/partials/head-meta.html", encoding="utf-8") as f:
+        head_meta = f.read()
+    published_at = published_at or datetime.today()
+    words = len(re.findall(r"\w+", body_md))
+    site = configs["base_config"]["site"]
+    site_name = site.get("name", "")
+    site_url = site.get("url", "").rstrip("/")
+    base_url = site.get("base_url", "").rstrip("/")
+    content = (post_tpl
+        .replace("{{POST_TITLE}}", title)
+        .replace("{{DATE}}", published_at.strftime("%Y-%m-%d"))
+        .replace("{{READING_TIME}}", f"{max(1, words // 200)} min read")
+        .replace("{{POST_BODY}}", legacy_md_to_html(body_md))
+        .replace("{{RELATED}}", "")
+        .replace("{{FAQ}}", faq_html))
+    canonical_url = (f"{site_url}{base_url}/posts/"
+        f"{published_at.year:04d}/{published_at.month:02d}/{published_at.day:02d}/{slug}.html")
+    description = legacy_plain_text(body_md)[:160]
+    head_filled = (head_meta
+        .replace("{{TITLE}}", title)
+        .replace("{{DESCRIPTION}}", description)
+        .replace("{{CANONICAL}}", canonical_url)
+        .replace("{{PUBLISHED_ISO}}", published_at.strftime("%Y-%m-%d"))
+        .replace("{{UPDATED_ISO}}", published_at.strftime("%Y-%m-%d"))
+        .replace("{{BYLINE}}", site.get("brand_byline", ""))
+        .replace("{{SITE_NAME}}", site.get("name", ""))) + "\n" + faq_jsonld
+    layout = layout.replace("{{ head_meta }}", head_filled)
+    layout = layout.replace("{{ page_title }}", f"{title} — {site_name}" if site_name else title)
+    layout = layout.replace("{{ page_description }}", escape(description, quote=True))
+    layout = layout.replace("{{ site.name }}", site_name)
+    return layout.replace("{{ content }}", content)
+
+
+def bench(fn, n, args):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn(*args[0], **args[1])
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=1500)
+    args = parser.parse_args()
+
+    configs = load_configs()
+    md = synthetic_article(args.words)
+    faq_html, faq_jsonld = extract_faq(md)
+    call = (("luggage scale", md, faq_html, faq_jsonld, configs),
+            {"slug": "luggage-scale-120000", "published_at": datetime(2025, 1, 2)})
+    legacy = bench(legacy_render_post_html, args.n, call)
+    current = bench(render_post_html, args.n, call)
+    print(f"legacy   {legacy:8.0f} renders/s")
+    print(f"current  {current:8.0f} renders/s  ({current / legacy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Per-post cost of save_post in a batch run, vs. the old re-parse of the page.
+
+The old save path parsed the rendered HTML with BeautifulSoup to pull the
+<article> text for the index description; that now comes from RenderedPost.
+
+Usage: python bench/bench_save.py [--n 200] [--words 1500]
+"""
+import argparse, contextlib, io, os, re, sys, tempfile, time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from writer.config import load_configs  # noqa: E402
+from writer.faq import extract_faq  # noqa: E402
+from writer.poststore import PostStore  # noqa: E402
+from writer.render import render_post_html  # noqa: E402
+from writer.storage import save_post  # noqa: E402
+from bench.synth import synthetic_article  # noqa: E402
+
+
+def legacy_description(html, title):
+    try:
+        desc = BeautifulSoup(html, "html.parser").find("article").get_text(" ", strip=True)
+        return re.sub(r"\s+", " ", desc)[:200]
+    except Exception:
+        return f"{title} article"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=200)
+    parser.add_argument("--words", type=int, default=1500)
+    args = parser.parse_args()
+
+    configs = load_configs()
+    when = datetime(2025, 1, 1)
+    posts = []
+    for i in range(args.n):
+        md = synthetic_article(args.words, seed=i)
+        faq_html, faq_jsonld = extract_faq(md)
+        posts.append(render_post_html(f"post {i}", md, faq_html, faq_jsonld, configs,
+                                      slug=f"post-{i}", published_at=when + timedelta(minutes=i)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        configs = {**configs, "root": tmp, "state": {}, "state_path": os.path.join(tmp, "state.json"),
+                   "store": PostStore(os.path.join(tmp, "posts.jsonl"))}
+        try:
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i, post in enumerate(posts):
+                    save_post(f"post {i}", post, configs, slug=f"post-{i}",
+                              published_at=when + timedelta(minutes=i), commit=False)
+            save_dt = time.perf_counter() - t0
+        finally:
+            os.chdir(cwd)
+
+    t0 = time.perf_counter()
+    for i, post in enumerate(posts):
+        legacy_description(post.html, f"post {i}")
+    parse_dt = time.perf_counter() - t0
+
+    per_save = save_dt / args.n * 1000
+    per_parse = parse_dt / args.n * 1000
+    print(f"save_post now          {per_save:7.2f} ms/post")
+    print(f"old save (+ re-parse)  {per_save + per_parse:7.2f} ms/post")
+    print(f"saved per post         {per_parse:7.2f} ms ({args.n} posts: {parse_dt:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Watch-mode rebuilds of serve.py: latency per edit, and that the edit shows up.
+
+Builds a small synthetic site (bench/synth.py), then replays the edits the
+watcher sees — a new asset reference in a root shell, a new ad slot in a root
+shell, a stylesheet change — through serve.plan()/serve.rebuild() and checks
+the outputs the preview would serve (fingerprinted references, filled slot,
+page/2+ pointing at the new stylesheet). Also checks GET/HEAD under and
+outside base_url against the preview handler. Any failed check is reported
+and the script exits with status 1.
+
+Usage: python bench/bench_serve.py [--posts 300] [--pages 50]
+"""
+import argparse, contextlib, http.client, io, shutil, sys, tempfile, threading, time
+from functools import partial
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+import rebuild_index as r  # noqa: E402
+import serve  # noqa: E402
+from bench.synth import synthetic_site  # noqa: E402
+from writer.assets import load_asset_map  # noqa: E402
+from writer.manifest import load_manifest  # noqa: E402
+
+
+def edit(rel, append):
+    def apply(site):
+        with open(site / rel, "a", encoding="utf-8") as f:
+            f.write(append)
+    return apply
+
+
+def hashed_ref(name):
+    """Check: `page` links the current fingerprinted copy of assets/<name>."""
+    def check(site, page):
+        return f"assets/{load_asset_map(str(site))[name]}" in (site / page).read_text(encoding="utf-8")
+    return check
+
+
+def run_edit(site, apply):
+    """Apply an edit the way the watcher sees it; returns (steps, seconds)."""
+    seen = serve.snapshot()
+    apply(site)
+    steps = serve.plan(serve.diff(seen, serve.snapshot()))
+    assert "rerender" not in steps  # rerender.py работает с деревом репозитория, не с копией
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        serve.rebuild(steps)
+    return steps, time.perf_counter() - t0
+
+
+def check_http(site):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(serve.PreviewHandler, directory=str(site)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    results = []
+    for method in ("GET", "HEAD"):
+        for path, expected in ((f"{r.BASE}/privacy.html", 200), ("/privacy.html", 302 if r.BASE else 200)):
+            conn = http.client.HTTPConnection("127.0.0.1", server.server_port)
+            conn.request(method, path)
+            status = conn.getresponse().status
+            conn.close()
+            results.append((f"{method} {path}", status == expected, f"{status}, expected {expected}"))
+    server.shutdown()
+    server.server_close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=300)
+    parser.add_argument("--pages", type=int, default=50, help="Newest posts that get a rendered page")
+    args = parser.parse_args()
+
+    site = Path(tempfile.mkdtemp(prefix="bench-serve-"))
+    failed = []
+    try:
+        synthetic_site(site, REPO, args.posts, pages=args.pages)
+        serve.ROOT = site
+        r.load_site(site)
+        r.MANIFEST = load_manifest(r.MANIFEST_PATH)
+        with contextlib.redirect_stdout(io.StringIO()):
+            serve.rebuild([name for name in serve.STEPS if name not in ("site", "rerender", "index_template")])
+        base = r.BASE
+
+        cases = [
+            ("script added to privacy.html", edit("privacy.html", f'<script src="{base}/assets/toc.js"></script>\n'),
+             "privacy.html", hashed_ref("toc.js")),
+            ("ad slot added to search.html", edit("search.html", '<div class="ad-slot" data-ad="slot1"></div>\n'),
+             "search.html", lambda s, page: "<!-- ad:slot1:" in (s / page).read_text(encoding="utf-8")),
+            ("assets/style.css changed", edit("assets/style.css", "\n/* bench */\n"),
+             "page/2/index.html", hashed_ref("style.css")),
+        ]
+        print(f"{'edit':<30} {'ms':>8}  steps")
+        for name, apply, page, check in cases:
+            steps, dt = run_edit(site, apply)
+            ok = check(site, page)
+            print(f"{name:<30} {dt * 1000:>8.1f}  {', '.join(steps)}" + ("" if ok else f"  ❌ {page} not refreshed"))
+            if not ok:
+                failed.append(name)
+
+        for name, ok, detail in check_http(site):
+            print(f"{name:<30} {detail}" + ("" if ok else "  ❌"))
+            if not ok:
+                failed.append(name)
+    finally:
+        r.close_pool()
+        shutil.rmtree(site, ignore_errors=True)
+
+    if failed:
+        print(f"❌ {len(failed)} checks failed")
+        sys.exit(1)
+    print("✅ Every edit reached the served pages")
+
+
+if __name__ == "__main__":
+    main()
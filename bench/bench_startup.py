@@ -0,0 +1,67 @@
+"""Import-time budget for the entry points (python -X importtime).
+
+Importing generate.py / rebuild_index.py / rerender.py must not pull in
+openai, feedparser or bs4 (they are imported on first use) and must stay
+under the budget below. Exits with status 1 when a check fails, so it can
+run as a CI step.
+
+Usage: python bench/bench_startup.py [--runs 5] [--scale 1.0]
+"""
+import argparse, subprocess, sys
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+# module -> budget for its cumulative import time, ms
+BUDGET_MS = {
+    "generate": 150,
+    "rebuild_index": 120,
+    "rerender": 120,
+}
+HEAVY = ("openai", "feedparser", "bs4")
+
+
+def import_times(module):
+    """Return ({imported module: cumulative µs}, total µs) for one fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:  # header line
+            continue
+    return times, times.get(module, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="Interpreters per module; the fastest run counts")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the budgets (slow CI machines)")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'module':<16} {'import ms':>10} {'budget ms':>10}  heavy deps")
+    for module, budget in BUDGET_MS.items():
+        runs = [import_times(module) for _ in range(max(1, args.runs))]
+        times, best = min(runs, key=lambda r: r[1])
+        heavy = sorted({name.split(".")[0] for name in times} & set(HEAVY))
+        limit = budget * args.scale
+        ok = best / 1000 <= limit and not heavy
+        failed |= not ok
+        print(f"{module:<16} {best / 1000:>10.1f} {limit:>10.0f}  {', '.join(heavy) or '-'}"
+              f"{'' if ok else '  ❌'}")
+
+    if failed:
+        print("❌ Startup budget exceeded")
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Benchmark suite for the render and build pipeline on a synthetic site.
+
+Builds a deterministic synthetic site (bench/synth.py) with --posts posts, of
+which the newest --pages have rendered pages, then measures:
+
+  md_to_html, extract_faq, render_post_html, save_post   per article
+  every rebuild_index.py stage                           full and no-op runs
+
+Each result has wall time (best of --repeat), throughput and peak Python heap
+(tracemalloc, measured in a separate pass so it does not skew the timings).
+Results are compared with bench/baseline.json; any metric slower than
+baseline * (1 + --tolerance) (and by at least MIN_SECONDS) or with a peak
+above baseline * (1 + --mem-tolerance) is a regression and the script exits with status 1.
+The baseline is only comparable on the same machine and parameters: a run
+with other parameters exits with status 2 unless --save-baseline (record it)
+or --no-compare (just print the numbers) is given.
+
+Usage: python bench/bench_suite.py [--posts 10000] [--pages 1000] [--tags 20] [--words 1500]
+                                   [--articles 100] [--repeat 3] [--save-baseline | --no-compare]
+"""
+import argparse, contextlib, io, json, os, shutil, sys, tempfile, time, tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+import rebuild_index  # noqa: E402
+from writer.config import load_configs  # noqa: E402
+from writer.faq import extract_faq  # noqa: E402
+from writer.poststore import PostStore  # noqa: E402
+from writer.render import md_to_html, render_post_html  # noqa: E402
+from writer.storage import save_post  # noqa: E402
+from bench.synth import synthetic_article, synthetic_site  # noqa: E402
+
+BASELINE = REPO / "bench" / "baseline.json"
+MIN_SECONDS = 0.025  # разница меньше — шум (ФС, планировщик), не регрессия
+
+
+def timed(fn, repeat):
+    """Best wall time of fn() over repeat runs."""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def peak_kb(fn):
+    """Peak traced Python heap while fn() runs, in KB."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def result(seconds, items, peak):
+    return {"seconds": round(seconds, 5), "items": items,
+            "per_sec": round(items / seconds, 1) if seconds else None, "peak_kb": peak}
+
+
+def bench_articles(args, site):
+    configs = {**load_configs(), "root": str(site)}
+    articles = [synthetic_article(args.words, seed=i) for i in range(args.articles)]
+    faqs = [extract_faq(md) for md in articles]
+    when = datetime(2030, 1, 1)
+
+    def render_all():
+        return [render_post_html(f"Bench post {i}", md, *faqs[i], configs, slug=f"bench-{i}",
+                                 published_at=when + timedelta(minutes=i)) for i, md in enumerate(articles)]
+
+    rendered = render_all()
+
+    def save_all():
+        tmp = tempfile.mkdtemp(prefix="bench-save-")
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        cfg = {**configs, "root": tmp, "state": {}, "state_path": os.path.join(tmp, "state.json"),
+               "store": PostStore(os.path.join(tmp, "posts.jsonl"))}
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i, post in enumerate(rendered):
+                    save_post(f"Bench post {i}", post, cfg, slug=f"bench-{i}",
+                              published_at=when + timedelta(minutes=i), commit=False)
+            cfg["store"].flush()
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    cases = {
+        "md_to_html": lambda: [md_to_html(md) for md in articles],
+        "extract_faq": lambda: [extract_faq(md) for md in articles],
+        "render_post_html": render_all,
+        "save_post": save_all,
+    }
+    out = {}
+    for name, fn in cases.items():
+        seconds = timed(fn, args.repeat)
+        out[name] = result(seconds, len(articles), None if args.no_memory else peak_kb(fn))
+    return out
+
+
+def run_stages(full, traced=False):
+    """Run every rebuild_index stage once; {stage: seconds} or, traced, {stage: peak KB}."""
+    r = rebuild_index
+    r.FULL_REBUILD = full
+    r.MANIFEST = {} if full else dict(r.BUILT)
+    r.BUILT = {}
+    r.REPORT = {"written": [], "skipped": []}
+    r.TEMPLATES.clear()
+    out = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for stage in r.STAGES:
+            if traced:
+                out[stage.__name__] = peak_kb(stage)
+                continue
+            t0 = time.perf_counter()
+            stage()
+            out[stage.__name__] = time.perf_counter() - t0
+    return out
+
+
+def bench_rebuild(args, site):
+    r = rebuild_index
+    r.load_site(site)
+    r.JOBS = 1
+    out = {}
+    for mode, full in (("full", True), ("noop", False)):
+        best = {}
+        for _ in range(args.repeat):
+            if not full:
+                run_stages(True)  # no-op меряем после полной сборки с тем же манифестом
+            for name, dt in run_stages(full).items():
+                best[name] = min(dt, best.get(name, dt))
+        peaks = {}
+        if not args.no_memory:
+            if not full:
+                run_stages(True)
+            peaks = run_stages(full, traced=True)
+        for name, dt in best.items():
+            out[f"{name}[{mode}]"] = result(dt, args.posts, peaks.get(name))
+    return out
+
+
+def compare(results, baseline, args) -> list:
+    regressions = []
+    print(f"{'benchmark':<34} {'ms':>10} {'items/s':>11} {'peak MB':>8}  {'baseline ms':>11} {'Δ time':>8} {'Δ peak':>8}")
+    for name, cur in results.items():
+        base = baseline.get(name)
+        line = f"{name:<34} {cur['seconds'] * 1000:>10.1f} {cur['per_sec'] or 0:>11.0f} "
+        line += f"{cur['peak_kb'] / 1024:>8.1f}" if cur["peak_kb"] is not None else f"{'-':>8}"
+        flags = []
+        if base:
+            d_time = cur["seconds"] / base["seconds"] - 1 if base["seconds"] else 0.0
+            line += f"  {base['seconds'] * 1000:>11.1f} {d_time:>+8.0%}"
+            if d_time > args.tolerance and cur["seconds"] - base["seconds"] > MIN_SECONDS:
+                flags.append(f"time {d_time:+.0%}")
+            if cur["peak_kb"] is not None and base.get("peak_kb"):
+                d_peak = cur["peak_kb"] / base["peak_kb"] - 1
+                line += f" {d_peak:>+8.0%}"
+                if d_peak > args.mem_tolerance and cur["peak_kb"] - base["peak_kb"] > 256:
+                    flags.append(f"peak {d_peak:+.0%}")
+        if flags:
+            line += "  ❌ " + ", ".join(flags)
+            regressions.append(f"{name}: {', '.join(flags)}")
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--pages", type=int, default=1_000, help="Newest posts that get a rendered page")
+    parser.add_argument("--tags", type=int, default=20)
+    parser.add_argument("--words", type=int, default=1500)
+    parser.add_argument("--articles", type=int, default=100, help="Articles for the per-article benchmarks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs. the baseline")
+    parser.add_argument("--mem-tolerance", type=float, default=0.20, help="Allowed peak-memory growth vs. the baseline")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc passes")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--no-compare", action="store_true", help="Only print the results, ignore the baseline")
+    args = parser.parse_args()
+
+    params = {k: getattr(args, k) for k in ("posts", "pages", "tags", "words", "articles")}
+    stored = None
+    if args.baseline.exists() and not args.no_compare:
+        stored = json.loads(args.baseline.read_text(encoding="utf-8"))
+        # проверяем до прогона: несравнимый запуск не должен тихо пройти как «без регрессий»
+        if stored.get("params") != params and not args.save_baseline:
+            print(f"❌ {args.baseline.name} was recorded with {stored.get('params')}, not {params}; "
+                  "rerun with --no-compare or --save-baseline")
+            sys.exit(2)
+    site = Path(tempfile.mkdtemp(prefix="bench-site-"))
+    try:
+        t0 = time.perf_counter()
+        synthetic_site(site, REPO, args.posts, tags=args.tags, pages=args.pages, words=args.words // 2)
+        print(f"synthetic site: {args.posts} posts, {args.pages} pages, {args.tags} tags in {time.perf_counter() - t0:.1f}s")
+        results = {**bench_articles(args, site), **bench_rebuild(args, site)}
+    finally:
+        rebuild_index.close_pool()
+        shutil.rmtree(site, ignore_errors=True)
+
+    baseline = stored.get("results", {}) if stored and stored.get("params") == params else {}
+    regressions = compare(results, baseline, args)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({"params": params, "results": results}, indent=2) + "\n", encoding="utf-8")
+        print(f"💾 Baseline saved to {args.baseline.relative_to(REPO) if args.baseline.is_relative_to(REPO) else args.baseline}")
+    elif regressions:
+        print(f"❌ {len(regressions)} regressions vs. {args.baseline.name}:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+    elif baseline:
+        print("✅ No regressions vs. the baseline")
+
+
+if __name__ == "__main__":
+    main()
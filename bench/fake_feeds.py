@@ -0,0 +1,107 @@
+"""Local RSS feeds with injected latency, for fetch_news_from_rss().
+
+Serves /<name>.xml for every fixture feed in FEEDS. Each feed gets a behaviour
+dict (unknown feeds use "*"):
+  delay   seconds before the response starts
+  drip    send the body in DRIP-byte pieces, this many seconds apart
+  status  answer with this HTTP status instead of the feed
+ETag / If-None-Match is honoured, so a second fetch of an unchanged feed is a 304.
+
+Usage: python bench/fake_feeds.py [--port 8766] [--delay 0.5]
+       then list the printed URLs in config/feeds.json ("rss_feeds")
+In-process: server, urls = serve({"slow": {"drip": 1}}); ...; server.shutdown()
+"""
+import argparse, hashlib, threading, time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+# name -> headlines, newest first; pubDate — час между записями, ленты сдвинуты на минуту
+FEEDS = {
+    "world": ["Summit ends with a climate pledge", "Rail strike enters its second week", "Floods close mountain passes"],
+    "travel": ["Night trains return to the Alps", "Airport queues ease after upgrade", "Island reopens to visitors"],
+    "tech": ["Chipmaker unveils low-power laptop line", "Open-source browser ships new engine", "Satellite internet expands"],
+    "slow": ["Slow feed headline one", "Slow feed headline two"],
+}
+EPOCH = 1_767_225_600  # 2026-01-01 00:00 UTC
+DRIP = 64
+
+
+def render_feed(name) -> bytes:
+    shift = list(FEEDS).index(name) * 60
+    items = "".join(
+        f"<item><title>{escape(title)}</title><link>https://example.com/{name}/{n}</link>"
+        f"<guid>https://example.com/{name}/{n}</guid><pubDate>{formatdate(EPOCH - shift - n * 3600, usegmt=True)}</pubDate></item>"
+        for n, title in enumerate(FEEDS[name])
+    )
+    return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>{name}</title>'
+            f"<link>https://example.com/{name}</link><description>fixture</description>{items}</channel></rss>").encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        name = self.path.strip("/").removesuffix(".xml")
+        server = self.server
+        with server.lock:
+            server.calls.append(name)
+            rule = server.behaviour.get(name, server.behaviour.get("*", {}))
+        time.sleep(rule.get("delay", 0))
+        if name not in FEEDS or rule.get("status"):
+            self.send_response(rule.get("status", 404))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = render_feed(name)
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        try:
+            if not rule.get("drip"):
+                self.wfile.write(body)
+                return
+            for start in range(0, len(body), DRIP):
+                self.wfile.write(body[start:start + DRIP])
+                self.wfile.flush()
+                time.sleep(rule["drip"])
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # клиент бросил ленту по дедлайну
+
+
+def serve(behaviour=None, port=0):
+    """Start the fixture feeds on a daemon thread; returns (server, [feed urls])."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    server.behaviour = behaviour or {}
+    server.calls = []
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, [f"http://127.0.0.1:{server.server_port}/{name}.xml" for name in FEEDS]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--delay", type=float, default=0.5)
+    args = parser.parse_args()
+    server, urls = serve({"*": {"delay": args.delay}}, port=args.port)
+    print("fixture feeds:\n  " + "\n  ".join(urls))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Local OpenAI-compatible chat endpoint with injected latency and failures.
+
+Every model gets a behaviour dict (unknown models use "*"):
+  delay        seconds before the response starts (time to first token)
+  chunk_delay  seconds between streamed chunks
+  fail         answer the next N requests with an error
+  status       HTTP status for those errors (default 503)
+  hang_after   stop sending (but keep the connection open) after N chunks
+
+Usage: python bench/fake_llm.py [--port 8765] [--delay 1.0]
+       then OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=x python generate.py
+In-process: server, url = serve({"gpt-5-mini": {"delay": 5}}); ...; server.shutdown()
+"""
+import argparse, json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ARTICLE = (
+    "# Introduction\nAll about {keyword} (written by {model}).\n\n## Details\n- one\n- two\n\n"
+    "# FAQ\nQ: What is {keyword}?\nA: A thing.\nQ: Why?\nA: Because.\n\n"
+    "# Sources\n- https://example.com\n"
+)
+CHUNK = 24
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        req = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model = req.get("model", "")
+        server = self.server
+        with server.lock:
+            rule = server.behaviour.get(model, server.behaviour.get("*", {}))
+            server.calls.append(model)
+            failing = rule.get("fail", 0) > 0
+            if failing:
+                rule["fail"] -= 1
+        if failing:
+            self._json(rule.get("status", 503), {"error": {"message": f"{model} failed", "type": "server_error"}})
+            return
+        time.sleep(rule.get("delay", 0))
+        user = req["messages"][-1]["content"]
+        text = ARTICLE.format(keyword=user.split("\n")[0].replace("Primary keyword: ", ""), model=model)
+        if not req.get("stream"):
+            self._json(200, {
+                "id": "fake", "object": "chat.completion", "created": 0, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            })
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        try:
+            for n, start in enumerate(range(0, len(text), CHUNK)):
+                if n == rule.get("hang_after", -1):
+                    time.sleep(3600)
+                chunk = {"id": "fake", "object": "chat.completion.chunk", "created": 0, "model": model,
+                         "choices": [{"index": 0, "delta": {"content": text[start:start + CHUNK]}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(rule.get("chunk_delay", 0))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # клиент закрыл поток (проигравший хедж-запрос)
+        self.close_connection = True
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(behaviour=None, port=0):
+    """Start the fake endpoint on a daemon thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    server.behaviour = behaviour or {}
+    server.calls = []
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=1.0)
+    args = parser.parse_args()
+    server, url = serve({"*": {"delay": args.delay}}, port=args.port)
+    print(f"fake LLM endpoint at {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Deterministic synthetic corpus for the benchmarks in bench/.
+
+Posts have the same shape as entries in data/posts.jsonl and are returned
+newest first, like PostStore.posts().
+"""
+import random
+from datetime import date, timedelta
+
+WORDS = (
+    "luggage scale travel airline baggage weight digital portable suitcase "
+    "battery hook strap compact trip fee carry on checked flight airport "
+    "kilogram pound display accurate budget premium review guide tips packing "
+    "limit overweight gadget durable lightweight backpack holiday journey"
+).split()
+
+
+def synthetic_posts(n, *, tags=20, seed=0, start=date(2020, 1, 1), per_day=10):
+    rnd = random.Random(seed)
+    tag_names = [f"tag-{i}" for i in range(tags)]
+    posts = []
+    for i in range(n):
+        day = start + timedelta(days=i // per_day)
+        title = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(3, 8))).capitalize()
+        slug = "-".join(title.lower().split()) + f"-{i:06d}"
+        posts.append({
+            "title": title,
+            "url": f"/posts/{day.year:04d}/{day.month:02d}/{day.day:02d}/{slug}.html",
+            "date": day.isoformat(),
+            "description": " ".join(rnd.choice(WORDS) for _ in range(30))[:200],
+            "tags": ["auto"] + rnd.sample(tag_names, k=min(len(tag_names), rnd.randint(1, 3))),
+        })
+    posts.reverse()
+    return posts
+
+
+def synthetic_article(words=1500, *, seed=0, faq=5):
+    """Markdown shaped like the LLM output: # sections, ## subsections, bullets, FAQ, Sources."""
+    rnd = random.Random(seed)
+    sections = ["Introduction", "Background", "Analysis", "Impact", "Takeaways"]
+    per_section = max(1, words // len(sections))
+    out = []
+    for name in sections:
+        out.append(f"# {name}")
+        left = per_section
+        while left > 0:
+            kind = rnd.random()
+            if kind < 0.15:
+                out.append("## " + " ".join(rnd.choice(WORDS) for _ in range(4)).capitalize())
+            elif kind < 0.35:
+                for _ in range(rnd.randint(2, 5)):
+                    n = rnd.randint(5, 12)
+                    out.append("- " + " ".join(rnd.choice(WORDS) for _ in range(n)))
+                    left -= n
+            else:
+                n = rnd.randint(30, 70)
+                out.append(" ".join(rnd.choice(WORDS) for _ in range(n)).capitalize() + ".")
+                left -= n
+            out.append("")
+    out.append("# FAQ")
+    for _ in range(faq):
+        out.append("Q: " + " ".join(rnd.choice(WORDS) for _ in range(6)).capitalize() + "?")
+        out.append("A: " + " ".join(rnd.choice(WORDS) for _ in range(20)).capitalize() + ".")
+    out.append("")
+    out.append("# Sources")
+    for i in range(4):
+        out.append(f"- https://example.com/source-{i}")
+    return "\n".join(out) + "\n"
+
+
+SITE_FILES = ("index.html", "search.html", "privacy.html", "terms.html", "404.html", "robots.txt")
+SITE_DIRS = ("config", "templates", "assets")
+
+
+def synthetic_site(root, repo, n, *, tags=20, pages=1000, words=600, seed=0):
+    """
+    A buildable copy of the site in root: repo config/templates/assets/shells,
+    data/posts.jsonl + data/state.json with n synthetic posts and rendered
+    pages for the newest `pages` of them. Returns the posts (newest first).
+    """
+    import json, os, shutil
+    from datetime import datetime
+    from writer.faq import extract_faq
+    from writer.poststore import PostStore
+    from writer.render import render_post_html
+
+    root, repo = os.fspath(root), os.fspath(repo)
+    for name in SITE_DIRS:
+        shutil.copytree(os.path.join(repo, name), os.path.join(root, name), dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns("*.gz", "*.br"))
+    for name in SITE_FILES:
+        if os.path.exists(os.path.join(repo, name)):
+            shutil.copy(os.path.join(repo, name), os.path.join(root, name))
+    os.makedirs(os.path.join(root, "data"), exist_ok=True)
+    with open(os.path.join(root, "config", "feeds.json"), "w", encoding="utf-8") as f:
+        json.dump({"rss_feeds": []}, f)
+
+    posts = synthetic_posts(n, tags=tags, seed=seed)
+    store = PostStore(os.path.join(root, "data", "posts.jsonl"))
+    for p in reversed(posts):  # в posts.jsonl новые — в конце
+        store.add(p, flush=False)
+    store.flush()
+    with open(os.path.join(root, "data", "state.json"), "w", encoding="utf-8") as f:
+        json.dump({"keyword_index": 0, "seen_entries": []}, f)
+
+    with open(os.path.join(root, "config", "config.json"), "r", encoding="utf-8") as f:
+        configs = {"root": root, "base_config": json.load(f), "writer_config": {}}
+    for i, p in enumerate(posts[:pages]):
+        md = synthetic_article(words, seed=seed + i)
+        faq_html, faq_jsonld = extract_faq(md)
+        y, m, d = (int(x) for x in p["date"].split("-"))
+        slug = p["url"].rsplit("/", 1)[-1][:-len(".html")]
+        post = render_post_html(p["title"], md, faq_html, faq_jsonld, configs, slug=slug, published_at=datetime(y, m, d))
+        out = os.path.join(root, p["url"].lstrip("/"))
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(post.html)
+    return posts
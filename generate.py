@@ -4,15 +4,20 @@
 import argparse
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Optional, Tuple
 
+from writer import metrics
 from writer.config import load_configs
 from writer.prompts import build_prompt
 from writer.llm import call_openai
 from writer.faq import extract_faq
-from writer.render import render_post_html
-from writer.storage import save_post, fetch_news_from_rss, build_post_slug
+from writer.render import render_post_html, RenderedPost
+from writer.storage import save_post, commit_state, fetch_news_from_rss, build_post_slug, post_url
+from writer.dedupe import DuplicateArticle, dedupe_options, signature
+from writer.state import read_state
 
 
 def _load_keywords_list(configs) -> Optional[list]:
@@ -47,10 +52,8 @@ def _choose_keyword(configs) -> Tuple[Optional[str], Optional[int]]:
     # Default to -1 so first run picks index 0
     idx = -1
     try:
-        if state_path and os.path.exists(state_path):
-            with open(state_path, "r", encoding="utf-8") as f:
-                state = json.load(f) or {}
-            idx = int(state.get("keyword_index", -1))
+        if state_path:
+            idx = int(read_state(state_path).get("keyword_index", -1))
     except Exception as e:
         print(f"⚠️ Failed to read state.json for keyword_index: {e}")
 
@@ -58,32 +61,59 @@ def _choose_keyword(configs) -> Tuple[Optional[str], Optional[int]]:
     return kws[next_idx], next_idx
 
 
-def _persist_keyword_index(configs, next_idx: int) -> None:
-    """Persist the chosen keyword index into data/state.json (without losing other fields)."""
-    state_path = configs.get("state_path")
-    if not state_path:
-        return
-    try:
-        state = {}
-        if os.path.exists(state_path):
-            with open(state_path, "r", encoding="utf-8") as f:
-                try:
-                    state = json.load(f) or {}
-                except Exception:
-                    state = {}
-        state["keyword_index"] = next_idx
-        with open(state_path, "w", encoding="utf-8") as f:
-            json.dump(state, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"⚠️ Failed to persist keyword_index to state.json: {e}")
+_dedupe_lock = threading.Lock()
+
+
+def _claim_unique(article_md: str, url: str, configs, opts) -> list:
+    """
+    Check an article against every post's MinHash signature (LSH lookup).
+    If nothing is above the threshold, the signature is registered under url
+    right away, so parallel batch jobs also see each other; a job that then
+    fails drops it again with _release_claim(). Returns the hits.
+    """
+    sig = signature(article_md)
+    index = configs["signatures"]
+    with _dedupe_lock:
+        hits = index.query(sig, opts["threshold"])
+        if not hits or opts["action"] == "warn":
+            index.add(url, sig, flush=False)
+    return hits
+
 
+def _release_claim(url: str, configs):
+    """Drop the buffered signature of a post that was not saved, so commit_state() does not persist it."""
+    if configs.get("signatures") is not None:
+        with _dedupe_lock:
+            configs["signatures"].discard(url)
 
-def generate_post(keyword: str, summaries: str, configs, *, slug: str, published_at: datetime) -> str:
-    """Build prompts, call LLM, extract FAQ, render HTML."""
+
+def generate_post(keyword: str, summaries: str, configs, *, slug: str, published_at: datetime) -> Tuple[RenderedPost, dict]:
+    """
+    Build prompts, call LLM, extract FAQ, render HTML. Returns (post, source) for save_post.
+    Near-duplicates of existing posts are regenerated (bypassing the LLM cache),
+    rejected with DuplicateArticle or only reported, per "dedupe" in writer.json.
+    """
     sys_prompt, usr_prompt = build_prompt(keyword, summaries, configs)
-    article_md = call_openai(usr_prompt, sys_prompt)
+    opts = dedupe_options(configs) if configs.get("signatures") is not None else None
+    attempts = opts["attempts"] if opts and opts["action"] == "regenerate" else 1
+    call_configs = configs
+    for attempt in range(1, attempts + 1):
+        article_md = call_openai(usr_prompt, sys_prompt, call_configs)
+        if not opts:
+            break
+        hits = _claim_unique(article_md, post_url(published_at, slug), configs, opts)
+        if not hits:
+            break
+        similarity, other = hits[0]
+        print(f"⚠️ '{keyword}' is {similarity:.0%} similar to {other} (attempt {attempt}/{attempts})")
+        if opts["action"] == "warn":
+            break
+        if attempt == attempts:
+            raise DuplicateArticle(f"'{keyword}' duplicates {other} ({similarity:.0%})")
+        call_configs = {**configs, "no_cache": True}  # кэш вернул бы тот же текст
+
     faq_html, faq_jsonld = extract_faq(article_md)
-    html = render_post_html(
+    post = render_post_html(
         keyword,
         article_md,
         faq_html,
@@ -92,7 +122,59 @@ def generate_post(keyword: str, summaries: str, configs, *, slug: str, published
         slug=slug,
         published_at=published_at,
     )
-    return html
+    source = {"markdown": article_md, "faq_html": faq_html, "faq_jsonld": faq_jsonld}
+    return post, source
+
+
+def generate_batch(configs, count: int, summaries: str, concurrency: int) -> int:
+    """
+    Generate `count` posts for the next keywords in round-robin order.
+    LLM calls run on `concurrency` threads sharing one client; posts are saved
+    as they complete, then posts.jsonl and state.json (keyword_index) are written once.
+    Returns the number of saved posts.
+    """
+    kws = _load_keywords_list(configs)
+    if not kws:
+        print("⚠️ Batch mode needs config/keywords.json")
+        return 0
+
+    try:
+        start = int((configs.get("state") or {}).get("keyword_index", -1))
+    except (TypeError, ValueError):
+        start = -1
+
+    jobs, used_slugs = [], set()
+    for step in range(1, count + 1):
+        keyword = kws[(start + step) % len(kws)]
+        slug, published_at = build_post_slug(keyword)
+        # one keyword can repeat within a second when count > len(keywords)
+        base_slug, n = slug, 2
+        while slug in used_slugs:
+            slug, n = f"{base_slug}-{n}", n + 1
+        used_slugs.add(slug)
+        jobs.append((keyword, slug, published_at))
+
+    print(f"🧵 Generating {count} posts with concurrency {concurrency}")
+    saved = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(generate_post, kw, summaries, configs, slug=slug, published_at=published_at): (kw, slug, published_at)
+            for kw, slug, published_at in jobs
+        }
+        for fut in as_completed(futures):
+            kw, slug, published_at = futures[fut]
+            try:
+                post, source = fut.result()
+                save_post(kw, post, configs, slug=slug, published_at=published_at, commit=False, source=source)
+            except Exception as e:
+                print(f"⚠️ Failed to generate '{kw}': {e}")
+                _release_claim(post_url(published_at, slug), configs)
+                continue
+            saved += 1
+
+    commit_state(configs, keyword_index=(start + count) % len(kws))
+    print(f"✅ Batch finished: {saved}/{count} posts saved, posts.jsonl and state.json updated")
+    return saved
 
 
 def main():
@@ -102,11 +184,48 @@ def main():
     parser.add_argument("--auto", action="store_true", help="Auto mode for GitHub Actions")
     parser.add_argument("--keyword", type=str, default=None, help="Override keyword")
     parser.add_argument("--summaries", type=str, default=None, help="Override news summaries")
+    parser.add_argument("--count", type=int, default=None, help="Batch mode: generate N posts for the next N keywords")
+    parser.add_argument("--all-keywords", action="store_true", help="Batch mode: one post for every keyword in keywords.json")
+    parser.add_argument("--concurrency", type=int, default=None, help="Parallel LLM calls in batch mode")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache (data/llm-cache)")
+    parser.add_argument("--profile", action="store_true", help="cProfile every stage and dump the slowest one to data/metrics/")
     args = parser.parse_args()
+    configs["no_cache"] = args.no_cache
+    if (args.count or args.all_keywords) and args.keyword:
+        parser.error("--keyword cannot be combined with --count/--all-keywords")
+    if args.count is not None and args.count < 1:
+        parser.error("--count must be at least 1")
+    if args.concurrency is None:
+        args.concurrency = int(configs["writer_config"].get("concurrency", 4))
+    if args.concurrency < 1:
+        parser.error("--concurrency (or \"concurrency\" in config/writer.json) must be at least 1")
+
+    # время, файлы и байты по стадиям → data/metrics/generate.json
+    metrics.start_run("generate", configs["root"], profile=args.profile)
+    try:
+        run(configs, args)
+    finally:
+        report = metrics.finish_run()
+        print(f"⏱️ Stages (report: {metrics.METRICS_DIR}/generate.json):\n{metrics.summary(report)}")
+
+
+def run(configs, args):
+    # Посты, сохранённые до появления data/signatures.jsonl, тоже участвуют в проверке дублей
+    if dedupe_options(configs):
+        added = configs["signatures"].backfill(os.path.join(configs["root"], "blog-src", "posts"))
+        if added:
+            commit_state(configs)
+            print(f"🧬 Indexed {added} existing posts for the duplicate check")
 
     # Always try to fetch fresh news signals from RSS
     rss_title, rss_summary = fetch_news_from_rss(configs)
 
+    if args.count or args.all_keywords:
+        count = len(_load_keywords_list(configs) or []) if args.all_keywords else args.count
+        summaries = args.summaries or rss_summary or "Headline — Source"
+        generate_batch(configs, count, summaries, args.concurrency)
+        return
+
     # Decide on the keyword
     chosen_keyword = args.keyword  # explicit override wins
     chosen_idx = None
@@ -120,19 +239,25 @@ def main():
     # Decide on the summaries (news context for the article)
     summaries = args.summaries or rss_summary or "Headline — Source"
 
-    # Generate → Save → Persist keyword index (after save_post, to avoid overwrite)
+    # Generate → Save; the post and keyword index are committed in one locked write
     slug, published_at = build_post_slug(chosen_keyword)
 
-    html = generate_post(
-        chosen_keyword,
-        summaries,
-        configs,
-        slug=slug,
-        published_at=published_at,
-    )
-    save_post(chosen_keyword, html, configs, slug=slug, published_at=published_at)
-    if chosen_idx is not None:
-        _persist_keyword_index(configs, chosen_idx)
+    try:
+        post, source = generate_post(
+            chosen_keyword,
+            summaries,
+            configs,
+            slug=slug,
+            published_at=published_at,
+        )
+    except DuplicateArticle as e:
+        # ключевое слово всё равно сдвигаем, иначе следующий запуск повторит тот же дубль
+        print(f"⛔ Not saved: {e}")
+        commit_state(configs, **({"keyword_index": chosen_idx} if chosen_idx is not None else {}))
+        return
+    save_post(chosen_keyword, post, configs, slug=slug, published_at=published_at, commit=False, source=source)
+    commit_state(configs, **({"keyword_index": chosen_idx} if chosen_idx is not None else {}))
+    print("✅ Updated posts.jsonl and state.json")
 
 
 if __name__ == "__main__":
@@ -1,9 +1,18 @@
-import os, json, math
+import os, json, math, argparse, hashlib, shutil
+from html import escape
 from pathlib import Path
-from bs4 import BeautifulSoup
 from datetime import datetime
-from email.utils import format_datetime
-from collections import defaultdict
+
+from writer import metrics
+from writer.manifest import input_hash, load_manifest, save_manifest
+from writer.poststore import PostStore, open_store
+from writer.state import state_lock
+from writer.search_index import build_search_index
+from writer.related import RELATED_FILE, load_related, patch_related, related_block, update_related
+from writer.atomic import atomic_write_text
+from writer.templates import load_template
+from writer.ads import inline_ads, load_ads, page_slots, slots_key
+from writer.assets import COMPRESS_EXT, COMPRESS_MIN, compress_file, fingerprint_assets, rewrite_asset_refs
 
 ROOT = Path(__file__).resolve().parent
 
@@ -14,20 +23,95 @@ def write_text(path: Path, txt: str):
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(txt, encoding="utf-8")
 
-# --- Load site + state ---
-SITE_ALL = read_json("config/config.json")
-SITE = SITE_ALL.get("site", {})
-BASE = SITE.get("base_url", "").rstrip("/")
-SITE_URL = SITE.get("url", "").rstrip("/")
-POSTS_PER_PAGE = int(SITE.get("posts_per_page", 20))  # регулируется в config.json
+# --- Site + state ---
+# Заполняются в load_site() из точки входа, а не при импорте модуля.
+SITE = {}
+BASE = ""
+SITE_URL = ""
+POSTS_PER_PAGE = 20
+RELATED_K = 5
+RSS_ITEMS = 50
+STORE = None
+MANIFEST_PATH = None  # манифест сборки — свой у каждого сайта (ROOT)
+
+def load_site(root=None):
+    """Read config/config.json, open the post store (data/posts.jsonl) and locate the build manifest."""
+    global ROOT, SITE, BASE, SITE_URL, POSTS_PER_PAGE, RELATED_K, RSS_ITEMS, STORE, MANIFEST_PATH
+    if root is not None:
+        ROOT = Path(root)
+    MANIFEST_PATH = ROOT / MANIFEST_FILE
+    SITE = read_json("config/config.json").get("site", {})
+    BASE = SITE.get("base_url", "").rstrip("/")
+    SITE_URL = SITE.get("url", "").rstrip("/")
+    POSTS_PER_PAGE = int(SITE.get("posts_per_page", 20))  # регулируется в config.json
+    RELATED_K = int(SITE.get("related_posts", 5))
+    RSS_ITEMS = int(SITE.get("rss_items", 50))  # RSS — только свежие посты; архив целиком — в сайтмапах
+    # посты — в data/posts.jsonl (старый state.json мигрирует при открытии)
+    STORE = open_store(ROOT)
+
+# --- Incremental build manifest ---
+# Для каждого выходного файла храним хэш входов (срез постов + шаблон),
+# и пропускаем рендер, если входы не изменились с прошлого запуска.
+MANIFEST_FILE = "data/build-manifest.json"
+FULL_REBUILD = False
+MANIFEST = {}   # rel path -> input hash from the previous run
+BUILT = {}      # rel path -> input hash for this run
+REPORT = {"written": [], "skipped": []}
+
+def needs_write(path: Path, key: str) -> bool:
+    """Record the input hash for path; False if the previous run already wrote it."""
+    rel = path.relative_to(ROOT).as_posix()
+    BUILT[rel] = key
+    if not FULL_REBUILD and MANIFEST.get(rel) == key and path.exists():
+        REPORT["skipped"].append(rel)
+        return False
+    return True
+
+def emit(path: Path, key: str, render) -> bool:
+    """Write render() to path unless its input hash matches the previous run."""
+    if not needs_write(path, key):
+        return False
+    write_text(path, render())
+    REPORT["written"].append(path.relative_to(ROOT).as_posix())
+    return True
 
-STATE_PATH = ROOT / "data/state.json"
-STATE = read_json("data/state.json")
+def post_digests(posts) -> list:
+    """Hash every post once, so posts listed under several tags are not re-serialized."""
+    return [input_hash(p) for p in posts]
+
+def stage_counts(before) -> str:
+    written = len(REPORT["written"]) - before[0]
+    skipped = len(REPORT["skipped"]) - before[1]
+    return f"{written} written, {skipped} skipped"
+
+def stage_start():
+    return len(REPORT["written"]), len(REPORT["skipped"])
+
+def run_stage(fn):
+    """Run a build stage under writer.metrics: wall time + files/bytes written and skipped."""
+    before = stage_start()
+    with metrics.stage(fn.__name__):
+        fn()
+        written = REPORT["written"][before[0]:]
+        size = 0
+        for rel in written:
+            try:
+                size += (ROOT / rel).stat().st_size
+            except OSError:
+                pass
+        metrics.add(files=len(written), bytes=size, skipped=len(REPORT["skipped"]) - before[1])
 
 # --- Normalize state ---
 def normalize_state():
+    # под блокировкой: generate.py может дописывать posts.jsonl параллельно
+    with state_lock(ROOT):
+        STORE.reload()
+        _normalize_posts()
+    metrics.add(items=len(STORE.posts()))
+
+def _normalize_posts():
     changed = False
-    posts = STATE.get("posts", [])
+    posts = STORE.posts()
     norm_posts = []
     seen = set()
 
@@ -56,89 +140,253 @@ def normalize_state():
             changed = True
 
     if changed:
-        STATE["posts"] = norm_posts
-        STATE_PATH.write_text(json.dumps(STATE, ensure_ascii=False, indent=2), encoding="utf-8")
-        print("🧹 Normalized data/state.json")
+        STORE.rewrite(norm_posts)
+        print("🧹 Normalized data/posts.jsonl")
+    else:
+        STORE.compact()
+
+# --- Compiled list templates ---
+# Шаблон страницы парсится BeautifulSoup один раз и режется на (head, tail)
+# вокруг содержимого #list; карточки собираются обычным join строк.
+# Экранирование повторяет formatter="minimal" из bs4, поэтому вывод совпадает байт в байт.
+LIST_SLOT = "\x00LIST\x00"
+TAG_SLOT = "\x00TAG\x00"
+TAG_TEMPLATE = "<html><body><h1>Tag: " + TAG_SLOT + "</h1><div id='list'></div></body></html>"
+TAGS_TEMPLATE = "<html><body><h1>Tags</h1><div id='list'></div></body></html>"
+
+def compile_list_template(html: str):
+    """Parse a page template once and split it around the #list container."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    list_div = soup.find(id="list")
+    if not list_div:
+        raise ValueError("template has no element with id='list'")
+    list_div.clear()
+    list_div.append(LIST_SLOT)
+    head, tail = str(soup).split(LIST_SLOT)
+    return head, tail
+
+def esc_text(s) -> str:
+    return escape(str(s), quote=False)
+
+def esc_attr(s) -> str:
+    s = escape(str(s), quote=False)
+    if '"' in s:
+        if "'" in s:
+            return '"' + s.replace('"', "&quot;") + '"'
+        return "'" + s + "'"
+    return '"' + s + '"'
+
+def render_card(p) -> str:
+    href = f"{BASE}{p['url']}" if isinstance(p.get("url"), str) else "#"
+    return (
+        '<div class="article-card"><a href=' + esc_attr(href) + '>'
+        + esc_text(p.get("title", "Untitled")) + '</a><div class="meta">'
+        + esc_text(p.get("date", "")) + '</div><p>'
+        + esc_text(p.get("description", "")) + '</p></div>'
+    )
+
+def page_href(prefix: str, page: int) -> str:
+    """Page 1 of a listing is <prefix>/, the rest <prefix>/page/N/index.html."""
+    return f"{prefix}/" if page == 1 else f"{prefix}/page/{page}/index.html"
+
+def render_pagination(page: int, pages: int, prefix=None) -> str:
+    prefix = BASE if prefix is None else prefix
+    links = []
+    if page > 1:
+        links.append("<a href=" + esc_attr(page_href(prefix, page - 1)) + ">← Previous</a>")
+    if page < pages:
+        links.append("<a href=" + esc_attr(page_href(prefix, page + 1)) + ">Next →</a>")
+    return '<div class="pagination">' + "".join(links) + "</div>"
+
+TEMPLATES = {}  # name -> (head, tail)
+
+def list_template(name: str):
+    # index.html читаем до того, как его перезапишет первая страница
+    if name not in TEMPLATES:
+        if name == "index":
+            html = (ROOT / "index.html").read_text(encoding="utf-8")
+        else:
+            html = TAGS_TEMPLATE if name == "tags" else TAG_TEMPLATE
+        TEMPLATES[name] = compile_list_template(html)
+    return TEMPLATES[name]
+
+# --- Parallel page emission ---
+# Страницы независимы, поэтому рендер и запись раздаются пулу процессов.
+# Посты и скомпилированные шаблоны передаются воркерам один раз (initializer),
+# задания — только номера страниц и индексы постов.
+JOBS = 1
+POOL = None
+
+def _init_worker(root, base, posts, templates):
+    global ROOT, BASE, STORE
+    ROOT, BASE = root, base
+    STORE = PostStore(posts=posts)
+    TEMPLATES.update(templates)
+
+def get_pool():
+    global POOL
+    if POOL is None:
+        for name in ("index", "tag", "tags"):
+            list_template(name)
+        from concurrent.futures import ProcessPoolExecutor
+        POOL = ProcessPoolExecutor(
+            max_workers=JOBS,
+            initializer=_init_worker,
+            initargs=(ROOT, BASE, STORE.posts(), dict(TEMPLATES)),
+        )
+    return POOL
+
+def close_pool():
+    global POOL
+    if POOL is not None:
+        POOL.shutdown()
+        POOL = None
+
+def run_jobs(fn, jobs) -> list:
+    """Run fn over jobs serially or on the pool; results keep the order of jobs."""
+    if JOBS <= 1 or len(jobs) < 2:
+        return [fn(job) for job in jobs]
+    chunksize = max(1, len(jobs) // (JOBS * 4))
+    return list(get_pool().map(fn, jobs, chunksize=chunksize))
+
+def write_index_page(job) -> str:
+    page, pages, start, end = job
+    head, tail = list_template("index")
+    cards = "".join(render_card(p) for p in STORE.posts()[start:end])
+    # добавляем навигацию
+    out_path = ROOT / "index.html" if page == 1 else ROOT / "page" / str(page) / "index.html"
+    write_text(out_path, head + cards + render_pagination(page, pages) + tail)
+    return out_path.relative_to(ROOT).as_posix()
+
+def tag_page_path(tag: str, page: int) -> Path:
+    folder = ROOT / "tags" / tag
+    return folder / "index.html" if page == 1 else folder / "page" / str(page) / "index.html"
+
+def write_tag_page(job) -> str:
+    tag, page, pages, ids = job
+    head, tail = list_template("tag")
+    posts = STORE.posts()
+    out = tag_page_path(tag, page)
+    cards = "".join(render_card(posts[i]) for i in ids)
+    write_text(out, head.replace(TAG_SLOT, esc_text(tag)) + cards + render_pagination(page, pages, f"{BASE}/tags/{tag}") + tail)
+    return out.relative_to(ROOT).as_posix()
 
 # --- Build paginated index pages ---
 def build_main_and_pages():
-    posts = STATE.get("posts", [])
+    before = stage_start()
+    posts = STORE.posts()
     total = len(posts)
     pages = math.ceil(total / POSTS_PER_PAGE)
 
-    template_path = ROOT / "index.html"
-    soup_template = BeautifulSoup(template_path.read_text(encoding="utf-8"), "html.parser")
+    head, tail = list_template("index")
+    template_key = input_hash(head, tail, BASE)
 
+    jobs = []
     for page in range(1, pages + 1):
         start = (page - 1) * POSTS_PER_PAGE
         end = start + POSTS_PER_PAGE
-        page_posts = posts[start:end]
-
-        soup = BeautifulSoup(str(soup_template), "html.parser")
-        list_div = soup.find(id="list")
-        if list_div:
-            list_div.clear()
-
-        for p in page_posts:
-            item = soup.new_tag("div", attrs={"class": "article-card"})
-            href = f"{BASE}{p['url']}" if isinstance(p.get("url"), str) else "#"
-            a = soup.new_tag("a", href=href)
-            a.string = p.get("title", "Untitled")
-            meta = soup.new_tag("div", attrs={"class": "meta"})
-            meta.string = p.get("date", "")
-            desc = soup.new_tag("p")
-            desc.string = p.get("description", "")
-            item.append(a); item.append(meta); item.append(desc)
-            list_div.append(item)
-
-        # добавляем навигацию
-        nav = soup.new_tag("div", attrs={"class": "pagination"})
-        if page > 1:
-            prev_href = f"{BASE}/" if (page - 1) == 1 else f"{BASE}/page/{page-1}/index.html"
-            prev_link = soup.new_tag("a", href=prev_href)
-            prev_link.string = "← Previous"
-            nav.append(prev_link)
-        if page < pages:
-            next_link = soup.new_tag("a", href=f"{BASE}/page/{page+1}/index.html")
-            next_link.string = "Next →"
-            nav.append(next_link)
-        if list_div:
-            list_div.append(nav)
 
         # сохраняем
         if page == 1:
             out_path = ROOT / "index.html"
         else:
             out_path = ROOT / "page" / str(page) / "index.html"
-        write_text(out_path, str(soup))
+        key = input_hash(template_key, posts[start:end], page, page > 1, page < pages)
+        if needs_write(out_path, key):
+            jobs.append((page, pages, start, end))
+    REPORT["written"].extend(run_jobs(write_index_page, jobs))
+    metrics.add(items=pages)
+    print(f"✅ Rebuilt {pages} index pages with pagination ({stage_counts(before)})")
 
-    # client search index
-    feeds_dir = ROOT / "feeds"
-    feeds_dir.mkdir(parents=True, exist_ok=True)
-    write_text(feeds_dir / "search.json", json.dumps(posts[:200], ensure_ascii=False, indent=2))
-    print(f"✅ Rebuilt {pages} index pages with pagination")
+# --- Build client search index (feeds/search/) ---
+def build_search():
+    before = stage_start()
+    meta, shards, chunks = build_search_index(STORE.posts())
+    out_dir = ROOT / "feeds" / "search"
+    outputs = {out_dir / "meta.json": meta}
+    for name, terms in shards.items():
+        outputs[out_dir / f"t-{name}.json"] = terms
+    for n, rows in enumerate(chunks):
+        outputs[out_dir / f"docs-{n}.json"] = rows
 
-# --- Build sitemap.xml & rss.xml ---
-def build_sitemap_and_rss():
-    posts = STATE.get("posts", [])[:500]
-    base = BASE
-    site_url = SITE_URL
+    for path, data in outputs.items():
+        emit(path, input_hash(data), lambda data=data: json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    # шарды, которых больше нет в индексе
+    if out_dir.exists():
+        for stale in out_dir.glob("*.json"):
+            if stale not in outputs:
+                stale.unlink()
+    metrics.add(items=len(outputs))
+    print(f"✅ Rebuilt search index: {len(shards)} shards, {len(chunks)} doc chunks ({stage_counts(before)})")
 
-    sitemap = ['<?xml version="1.0" encoding="UTF-8"?>',
-               '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+# --- Build sitemaps (sitemap_index.xml + sitemap-N.xml) & rss.xml ---
+# Посты идут в шарды от старых к новым, поэтому новый пост меняет только последний
+# шард. Шард пишется потоково, строка за строкой; ключ манифеста — хэш его строк.
+SITEMAP_URLS = 10000  # лимит протокола — 50 000 URL / 50 МБ на файл
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+def absolute_url(path):
+    return f"{SITE_URL}{BASE}{path}" if SITE_URL else f"{BASE}{path}"
+
+def post_lastmod(p):
+    """Последнее изменение поста: "updated" из хранилища, иначе дата публикации."""
+    return p.get("updated") or p.get("date", "")
+
+def sitemap_lines(posts):
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
     for p in posts:
-        loc = f"{site_url}{base}{p['url']}" if site_url else f"{base}{p['url']}"
-        lastmod = p.get("date", "")
-        sitemap.append(f"<url><loc>{loc}</loc><lastmod>{lastmod}</lastmod></url>")
-    sitemap.append("</urlset>")
-    write_text(ROOT / "sitemap.xml", "\n".join(sitemap))
+        lastmod = post_lastmod(p)
+        lastmod_tag = f"<lastmod>{esc_text(lastmod)}</lastmod>" if lastmod else ""
+        yield f"<url><loc>{esc_text(absolute_url(p['url']))}</loc>{lastmod_tag}</url>\n"
+    yield "</urlset>\n"
 
+def emit_lines(path: Path, make_lines) -> bool:
+    """emit() for large outputs: hash the lines, then stream them to disk only if changed."""
+    h = hashlib.sha256()
+    for line in make_lines():
+        h.update(line.encode("utf-8"))
+    if not needs_write(path, h.hexdigest()):
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.writelines(make_lines())
+    REPORT["written"].append(path.relative_to(ROOT).as_posix())
+    return True
+
+def build_sitemap_and_rss():
+    from email.utils import format_datetime
+    before = stage_start()
+    posts = STORE.posts()
+    oldest_first = [p for p in reversed(posts) if isinstance(p.get("url"), str)]
+
+    shards = []
+    for n, start in enumerate(range(0, len(oldest_first), SITEMAP_URLS), 1):
+        chunk = oldest_first[start:start + SITEMAP_URLS]
+        path = ROOT / f"sitemap-{n}.xml"
+        emit_lines(path, lambda chunk=chunk: sitemap_lines(chunk))
+        shards.append((path.name, max((post_lastmod(p) for p in chunk), default="")))
+
+    index = ['<?xml version="1.0" encoding="UTF-8"?>', f'<sitemapindex xmlns="{SITEMAP_NS}">']
+    for name, lastmod in shards:
+        lastmod_tag = f"<lastmod>{esc_text(lastmod)}</lastmod>" if lastmod else ""
+        index.append(f"<sitemap><loc>{esc_text(absolute_url('/' + name))}</loc>{lastmod_tag}</sitemap>")
+    index.append("</sitemapindex>")
+    emit(ROOT / "sitemap_index.xml", input_hash(index), lambda: "\n".join(index))
+    # шарды, которых больше нет, и старый одиночный sitemap.xml (обрезанный до 500 постов)
+    names = {name for name, _ in shards}
+    for stale in [ROOT / "sitemap.xml", *ROOT.glob("sitemap-*.xml")]:
+        if stale.exists() and stale.name not in names:
+            stale.unlink()
+
+    base = BASE
+    site_url = SITE_URL
     rss = ['<?xml version="1.0" encoding="UTF-8"?>',
            '<rss version="2.0"><channel>',
            f"<title>{SITE.get('name','Blog')}</title>",
            f"<link>{site_url}{base}/</link>" if site_url else f"<link>{base}/</link>",
            f"<description>{SITE.get('name','Automated Blog')}</description>"]
-    for p in posts[:50]:
+    for p in posts[:RSS_ITEMS]:
         loc = f"{site_url}{base}{p['url']}" if site_url else f"{base}{p['url']}"
         try:
             pubdate = format_datetime(datetime.fromisoformat(p.get("date","")))
@@ -151,46 +399,230 @@ def build_sitemap_and_rss():
             f"<description><![CDATA[{p.get('description','')}]]></description></item>"
         )
     rss.append("</channel></rss>")
-    write_text(ROOT / "rss.xml", "\n".join(rss))
-    print("✅ Rebuilt sitemap.xml & rss.xml")
+    emit(ROOT / "rss.xml", input_hash(rss), lambda: "\n".join(rss))
+    metrics.add(items=len(oldest_first))
+    print(f"✅ Rebuilt {len(shards)} sitemap shards + sitemap_index.xml & rss.xml ({stage_counts(before)})")
 
 # --- Build tag pages ---
+# Архив тега режется на страницы по posts_per_page, как главная; tags/index.html —
+# список всех тегов со счётчиками. Всё строится из одного индекса тег → позиции постов.
 def build_tags():
-    posts = STATE.get("posts", [])
-    tags = defaultdict(list)
-    for p in posts:
-        for t in p.get("tags", []):
-            if isinstance(t, str) and t.strip():
-                tags[t.strip()].append(p)
-
-    for tag, arr in tags.items():
-        out = ROOT / "tags" / tag / "index.html"
-        out.parent.mkdir(parents=True, exist_ok=True)
-        soup = BeautifulSoup("<html><body><h1>Tag: "+tag+"</h1><div id='list'></div></body></html>", "html.parser")
-        list_div = soup.find(id="list")
-        if list_div:
-            list_div.clear()
-        for p in arr:
-            item = soup.new_tag("div", attrs={"class": "article-card"})
-            href = f"{BASE}{p['url']}"
-            a = soup.new_tag("a", href=href)
-            a.string = p.get("title", "Untitled")
-            meta = soup.new_tag("div", attrs={"class": "meta"})
-            meta.string = p.get("date", "")
-            desc = soup.new_tag("p")
-            desc.string = p.get("description", "")
-            item.append(a); item.append(meta); item.append(desc)
-            list_div.append(item)
-        write_text(out, str(soup))
-    print("✅ Rebuilt tag pages")
+    before = stage_start()
+    posts = STORE.posts()
+    tags = STORE.tag_index()
+
+    digests = post_digests(posts)
+    jobs, pages_total = [], 0
+    for tag, ids in tags.items():
+        pages = max(1, math.ceil(len(ids) / POSTS_PER_PAGE))
+        pages_total += pages
+        for page in range(1, pages + 1):
+            chunk = ids[(page - 1) * POSTS_PER_PAGE:page * POSTS_PER_PAGE]
+            key = input_hash(tag, [digests[i] for i in chunk], page, pages, BASE)
+            if needs_write(tag_page_path(tag, page), key):
+                jobs.append((tag, page, pages, chunk))
+        # страницы, оставшиеся от более длинного архива
+        extra = ROOT / "tags" / tag / "page"
+        if extra.is_dir():
+            for stale in extra.iterdir():
+                if stale.is_dir() and stale.name.isdigit() and int(stale.name) > pages:
+                    shutil.rmtree(stale)
+    REPORT["written"].extend(run_jobs(write_tag_page, jobs))
+
+    counts = sorted(((tag, len(ids)) for tag, ids in tags.items()), key=lambda x: (-x[1], x[0]))
+    emit(ROOT / "tags" / "index.html", input_hash(counts, BASE), lambda: render_tag_index(counts))
+    metrics.add(items=len(tags))
+    print(f"✅ Rebuilt {pages_total} tag pages for {len(tags)} tags + tags/index.html ({stage_counts(before)})")
+
+def render_tag_index(counts) -> str:
+    head, tail = list_template("tags")
+    items = "".join(
+        '<div class="tag-item"><a href=' + esc_attr(f"{BASE}/tags/{tag}/") + ">" + esc_text(tag)
+        + '</a> <span class="count">' + str(n) + "</span></div>"
+        for tag, n in counts
+    )
+    return head + items + tail
+
+# --- Related posts ---
+# Списки похожих постов считаются здесь (writer/related.py) и вшиваются в страницы
+# постов между маркерами; страница переписывается, только если её блок изменился.
+def build_related():
+    before = stage_start()
+    path = ROOT / RELATED_FILE
+    previous = {} if FULL_REBUILD else load_related(str(path))
+    data, changed = update_related(STORE.posts(), previous, k=RELATED_K)
+    if data != previous:
+        atomic_write_text(path, json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+    template = load_template(str(ROOT / "templates/partials/related.html"))
+    for url, entries in data["related"].items():
+        out = ROOT / url.lstrip("/")
+        block = related_block(template, entries, BASE)
+        key, block_key = f"related:{url}", input_hash(block)
+        if not out.exists():
+            continue
+        BUILT[key] = block_key
+        if not FULL_REBUILD and MANIFEST.get(key) == block_key:
+            REPORT["skipped"].append(key)
+            continue
+        html = out.read_text(encoding="utf-8")
+        patched = patch_related(html, block)
+        if patched is None or patched == html:
+            REPORT["skipped"].append(key)
+            continue
+        out.write_text(patched, encoding="utf-8")
+        REPORT["written"].append(out.relative_to(ROOT).as_posix())
+    metrics.add(items=len(changed))
+    print(f"✅ Related posts: {len(changed)} lists changed ({stage_counts(before)})")
+
+# --- Assets: fingerprints + .gz/.br ---
+ROOT_SHELLS = ["index.html", "search.html", "privacy.html", "terms.html", "404.html"]
+
+def page_files():
+    """Root shells + every post page (existing files only)."""
+    files = [ROOT / name for name in ROOT_SHELLS]
+    files += [ROOT / p["url"].lstrip("/") for p in STORE.posts() if isinstance(p.get("url"), str)]
+    return [f for f in files if f.exists()]
+
+# Страницы, которые стадии правят на месте (ассеты, реклама), ключуются по своему
+# содержимому: "размер:mtime:sha256|параметры стадии". Пока размер и mtime те же,
+# файл не читается; после checkout (новый mtime) сравнивается уже хэш.
+def page_fingerprint(path: Path, old: str):
+    """("size:mtime:sha256", text) of a page; text is None when the previous key's size and mtime still match."""
+    st = path.stat()
+    stat_part = f"{st.st_size}:{st.st_mtime_ns}"
+    if old.startswith(stat_part + ":"):
+        return old.split("|", 1)[0], None
+    text = path.read_text(encoding="utf-8")
+    return f"{stat_part}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}", text
+
+def same_page(fingerprint: str, old: str) -> bool:
+    return bool(old) and old.split("|", 1)[0].rsplit(":", 1)[-1] == fingerprint.rsplit(":", 1)[-1]
+
+def patch_page(path: Path, text: str, fixed: str) -> str:
+    """Write fixed if it differs from text; returns the page's new fingerprint."""
+    rel = path.relative_to(ROOT).as_posix()
+    if fixed != text:
+        path.write_text(fixed, encoding="utf-8")
+        REPORT["written"].append(rel)
+    else:
+        REPORT["skipped"].append(rel)
+    st = path.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}:{hashlib.sha256(fixed.encode('utf-8')).hexdigest()}"
+
+def build_assets():
+    """Fingerprint assets/* and point root shells and post pages at the hashed copies."""
+    before = stage_start()
+    mapping, written, removed = fingerprint_assets(ROOT)
+    REPORT["written"].extend(written)
+    map_key = input_hash(mapping)
+
+    # корневые страницы правим на месте: index.html — ещё и шаблон списков
+    for out in page_files():
+        key = f"assets:{out.relative_to(ROOT).as_posix()}"
+        old = MANIFEST.get(key, "")
+        fingerprint, html = page_fingerprint(out, old)
+        if not FULL_REBUILD and same_page(fingerprint, old) and old.endswith("|" + map_key):
+            BUILT[key] = f"{fingerprint}|{map_key}"
+            REPORT["skipped"].append(key)
+            continue
+        if html is None:
+            html = out.read_text(encoding="utf-8")
+        BUILT[key] = f"{patch_page(out, html, rewrite_asset_refs(html, mapping))}|{map_key}"
+    print(f"✅ Fingerprinted {len(mapping)} assets, {len(removed)} stale copies removed ({stage_counts(before)})")
+
+# --- Ads baked into pages ---
+# Ключ манифеста страницы — её отпечаток (page_fingerprint) и слоты с ревизиями
+# ("...|slot1=1a2b3c4d,slot2=..."): страница разбирается, только если она сама
+# изменилась или ревизия одного из её слотов другая.
+def build_ads():
+    before = stage_start()
+    ads = load_ads(str(ROOT))
+    for out in page_files():
+        key = f"ads:{out.relative_to(ROOT).as_posix()}"
+        old = MANIFEST.get(key, "")
+        fingerprint, html = page_fingerprint(out, old)
+        if not FULL_REBUILD and same_page(fingerprint, old):
+            # страница та же — её слоты берём из прошлого ключа, без разбора HTML
+            old_slots = old.split("|", 1)[1] if "|" in old else ""
+            slots = [part.split("=")[0] for part in old_slots.split(",") if part]
+            if slots_key(slots, ads) == old_slots:
+                BUILT[key] = f"{fingerprint}|{old_slots}"
+                REPORT["skipped"].append(key)
+                continue
+        if html is None:
+            html = out.read_text(encoding="utf-8")
+        fixed = inline_ads(html, ads)
+        BUILT[key] = f"{patch_page(out, html, fixed)}|{slots_key(page_slots(fixed), ads)}"
+    print(f"✅ Inlined ads ({len(ads)} slots) ({stage_counts(before)})")
+
+COMPRESS_GLOBS = ["*.html", "*.xml", "page/**/*", "tags/**/*", "posts/**/*", "feeds/**/*", "assets/*"]
+
+def compress_outputs():
+    """
+    Write .gz/.br siblings for large text outputs, on max(JOBS, CPU count)
+    threads: zlib/brotli release the GIL, so this uses every core even with
+    --jobs 1. Key: size + mtime, then the content hash when those moved, so a
+    fresh checkout does not recompress everything.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from writer.assets import FINGERPRINTED_RE, brotli
+    before = stage_start()
+    sources, todo = set(), []
+    for pattern in COMPRESS_GLOBS:
+        for path in ROOT.glob(pattern):
+            if not path.is_file() or path.suffix not in COMPRESS_EXT:
+                continue
+            if path.parent == ROOT / "assets" and not FINGERPRINTED_RE.match(path.name):
+                continue  # несжатые исходники; отдаём хэшированные копии
+            st = path.stat()
+            if st.st_size < COMPRESS_MIN:
+                continue
+            rel = path.relative_to(ROOT).as_posix()
+            sources.add(path)
+            key = f"gz:{rel}"
+            stat_part = f"{st.st_size}:{st.st_mtime_ns}"
+            old = MANIFEST.get(key, "")
+            siblings_ok = Path(f"{path}.gz").exists() and (brotli is None or Path(f"{path}.br").exists())
+            if not FULL_REBUILD and siblings_ok and old.startswith(stat_part + ":"):
+                BUILT[key] = old
+                REPORT["skipped"].append(key)
+                continue
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            BUILT[key] = f"{stat_part}:{digest}"
+            if not FULL_REBUILD and siblings_ok and old.endswith(":" + digest):
+                REPORT["skipped"].append(key)
+                continue
+            todo.append(path)
+
+    with ThreadPoolExecutor(max_workers=max(JOBS, os.cpu_count() or 1)) as pool:
+        for written in pool.map(compress_file, todo):
+            REPORT["written"].extend(Path(w).relative_to(ROOT).as_posix() for w in written)
+
+    # сиблинги удалённых или ставших маленькими файлов
+    for pattern in COMPRESS_GLOBS:
+        for ext in (".gz", ".br"):
+            for sibling in ROOT.glob(pattern + ext):
+                if sibling.with_suffix("") not in sources:
+                    sibling.unlink()
+    print(f"✅ Precompressed {len(todo)} outputs{'' if brotli else ' (gzip only: brotli not installed)'} ({stage_counts(before)})")
 
 # --- Fix meta[name=site-base] ---
 def fix_root_shells():
-    for fname in ["index.html", "search.html", "privacy.html", "terms.html", "404.html"]:
+    before = stage_start()
+    for fname in ROOT_SHELLS:
         path = ROOT / fname
         if not path.exists():
             continue
-        soup = BeautifulSoup(path.read_text(encoding="utf-8"), "html.parser")
+        # ключ — текущее содержимое файла: если он не менялся с прошлой правки, парсить нечего
+        txt = path.read_text(encoding="utf-8")
+        shell_key = f"shell:{fname}"  # index.html также является первой страницей списка
+        if not FULL_REBUILD and MANIFEST.get(shell_key) == input_hash(txt, BASE):
+            BUILT[shell_key] = MANIFEST[shell_key]
+            REPORT["skipped"].append(fname)
+            continue
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(txt, "html.parser")
         head = soup.find("head")
         if head:
             meta = soup.find("meta", {"name":"site-base"})
@@ -199,13 +631,40 @@ def fix_root_shells():
                 head.append(meta)
             else:
                 meta["content"] = BASE
-        path.write_text(str(soup), encoding="utf-8")
-    print("✅ Fixed root shells (meta site-base)")
+        fixed = str(soup)
+        BUILT[shell_key] = input_hash(fixed, BASE)
+        if fixed == txt:
+            REPORT["skipped"].append(fname)
+            continue
+        path.write_text(fixed, encoding="utf-8")
+        REPORT["written"].append(fname)
+    metrics.add(items=len(ROOT_SHELLS))
+    print(f"✅ Fixed root shells (meta site-base) ({stage_counts(before)})")
+
+# порядок важен: index.html — шаблон списков, поэтому ассеты и реклама вшиваются до страниц
+STAGES = (normalize_state, build_assets, build_ads, build_main_and_pages, build_search,
+          build_sitemap_and_rss, build_tags, build_related, fix_root_shells, compress_outputs)
 
 if __name__ == "__main__":
-    normalize_state()
-    build_main_and_pages()
-    build_sitemap_and_rss()
-    build_tags()
-    fix_root_shells()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="Ignore the build manifest and rewrite every output")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for page rendering (1 = serial)")
+    parser.add_argument("--profile", action="store_true", help="cProfile every stage and dump the slowest one to data/metrics/")
+    args = parser.parse_args()
+    FULL_REBUILD = args.full
+    JOBS = max(1, args.jobs)
+
+    load_site()
+    if not FULL_REBUILD:
+        MANIFEST = load_manifest(MANIFEST_PATH)
+    metrics.start_run("rebuild_index", ROOT, profile=args.profile)
+    for stage in STAGES:
+        run_stage(stage)
+    close_pool()
+    save_manifest(MANIFEST_PATH, BUILT)
+    print(f"📝 {len(REPORT['written'])} files written, {len(REPORT['skipped'])} unchanged and skipped")
+    for rel in REPORT["written"]:
+        print(f"   ✎ {rel}")
+    report = metrics.finish_run(full=FULL_REBUILD, jobs=JOBS, written=len(REPORT["written"]), skipped=len(REPORT["skipped"]))
+    print(f"⏱️ Stages (report: {metrics.METRICS_DIR}/rebuild_index.json):\n{metrics.summary(report)}")
     print("🏁 Rebuild finished")
@@ -0,0 +1,115 @@
+"""
+Re-render post pages from their stored sources (blog-src/posts/**/*.json)
+with the current templates/, without calling the LLM.
+
+    python rerender.py            # only posts whose source or templates changed
+    python rerender.py --full     # every post
+    python rerender.py --jobs 4   # render on 4 worker processes
+
+Posts whose page HTML actually changed get "updated" (today) in
+data/posts.jsonl; the sitemap uses it as <lastmod>.
+"""
+import argparse, json
+from datetime import datetime
+from pathlib import Path
+
+from writer.config import load_configs
+from writer.manifest import input_hash, load_manifest, save_manifest
+from writer.render import render_post_html
+from writer.storage import commit_state
+
+ROOT = Path(__file__).resolve().parent
+SRC_DIR = ROOT / "blog-src" / "posts"
+MANIFEST_PATH = ROOT / "data/rerender-manifest.json"
+TEMPLATE_FILES = [
+    "templates/layout.html", "templates/post.html",
+    "templates/partials/head-meta.html", "templates/partials/related.html",
+]
+
+CONFIGS = None
+
+def _init_worker():
+    global CONFIGS
+    CONFIGS = load_configs()
+
+def templates_key(configs) -> str:
+    """Hash of everything besides the source that feeds a post page."""
+    texts = [(ROOT / rel).read_text(encoding="utf-8") for rel in TEMPLATE_FILES]
+    return input_hash(texts, configs["base_config"].get("site", {}))
+
+def render_source(src_file: str):
+    """Render one stored source to posts/...; returns the path relative to ROOT, or None if the page was already identical."""
+    if CONFIGS is None:
+        _init_worker()
+    src = json.loads(Path(src_file).read_text(encoding="utf-8"))
+    published_at = datetime.fromisoformat(src["published_at"])
+    post = render_post_html(
+        src["title"],
+        src["markdown"],
+        src.get("faq_html", ""),
+        src.get("faq_jsonld", ""),
+        CONFIGS,
+        slug=src["slug"],
+        published_at=published_at,
+    )
+    out = ROOT / src["url"].lstrip("/")
+    try:
+        if out.read_text(encoding="utf-8") == post.html:
+            return None  # не трогаем файл: иначе "updated" (и lastmod) сдвинулся бы без изменений
+    except FileNotFoundError:
+        out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(post.html, encoding="utf-8")
+    return out.relative_to(ROOT).as_posix()
+
+def rerender(full=False, jobs=1, configs=None):
+    """Re-render changed posts; a long-running caller (serve.py) passes its loaded configs."""
+    global CONFIGS
+    if configs is None:
+        configs = load_configs()
+    CONFIGS = configs  # render_source() в этом процессе берёт их же
+    tpl_key = templates_key(configs)
+    manifest = {} if full else load_manifest(MANIFEST_PATH)
+    built, todo, skipped = {}, [], 0
+
+    for src_file in sorted(SRC_DIR.rglob("*.json")):
+        rel = src_file.relative_to(ROOT).as_posix()
+        key = input_hash(tpl_key, src_file.read_bytes())
+        built[rel] = key
+        if manifest.get(rel) == key:
+            skipped += 1
+        else:
+            todo.append(str(src_file))
+
+    if jobs > 1 and len(todo) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+            results = list(pool.map(render_source, todo, chunksize=max(1, len(todo) // (jobs * 4))))
+    else:
+        results = [render_source(src) for src in todo]
+    written = [rel for rel in results if rel is not None]
+
+    mark_updated(configs, written)
+    save_manifest(MANIFEST_PATH, built)
+    print(f"✅ Re-rendered {len(written)} posts, {len(results) - len(written)} identical, {skipped} unchanged and skipped")
+    return written
+
+def mark_updated(configs, written):
+    """Set "updated" to today on the store records of pages whose HTML changed (one line per post per day)."""
+    store, today = configs["store"], datetime.today().strftime("%Y-%m-%d")
+    store.reload()  # посты, дописанные после load_configs()
+    changed = 0
+    for rel in written:
+        rec = store.get(f"/{rel}")
+        if rec is not None and rec.get("updated") != today:
+            store.add({**rec, "updated": today}, flush=False)
+            changed += 1
+    if changed:
+        commit_state(configs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="Ignore data/rerender-manifest.json and re-render every post")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes (1 = serial)")
+    args = parser.parse_args()
+    rerender(full=args.full, jobs=max(1, args.jobs))
+    print("🏁 Rerender finished")
@@ -0,0 +1,239 @@
+"""
+Local preview of the built site under the configured base_url.
+
+    python serve.py                  # http://127.0.0.1:8000/<base_url>/
+    python serve.py --watch          # + rebuild what a change affects, in the background
+    python serve.py --port 9000 --interval 0.25
+
+With --watch the source tree (templates/, assets/, config/*.json, the root
+shells, blog-src/posts/ and data/posts.jsonl) is polled; each change is mapped
+to the rebuild steps it affects (see plan()) and only those run. The post
+store, loaded configs, compiled list templates and the build manifest stay in
+memory between rebuilds, so an edit usually lands in well under a second.
+Requests wait while a rebuild runs. .gz/.br siblings are not refreshed while
+watching; run rebuild_index.py before deploying.
+"""
+import argparse, io, threading, time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import rebuild_index as r
+import rerender
+from writer.assets import FINGERPRINTED_RE
+from writer.config import load_configs
+from writer.manifest import load_manifest, save_manifest
+
+ROOT = Path(__file__).resolve().parent
+WATCH_GLOBS = ["templates/**/*", "assets/*", "config/*.json", "blog-src/posts/**/*.json", "data/posts.jsonl"]
+# пишутся и самой сборкой: свои правки после пересборки не считаем изменениями
+SELF_WRITTEN = {*r.ROOT_SHELLS, "data/posts.jsonl"}
+# пересборка держит его целиком, запрос — пока читает файл: страницы не отдаются наполовину пересобранными
+BUILD_LOCK = threading.Lock()
+
+
+def reload_site():
+    r.load_site(ROOT)
+    r.TEMPLATES.clear()
+    rerender.CONFIGS = None
+
+
+def rerender_posts():
+    if rerender.CONFIGS is None:  # сбрасывается reload_site() при правке config.json
+        rerender.CONFIGS = load_configs()
+    r.REPORT["written"].extend(rerender.rerender(configs=rerender.CONFIGS))
+
+
+# шаг -> что запустить; порядок важен (как в rebuild_index.STAGES)
+STEPS = {
+    "site": reload_site,
+    "posts": r.normalize_state,
+    "rerender": rerender_posts,
+    "assets": r.build_assets,
+    "ads": r.build_ads,
+    "index_template": lambda: r.TEMPLATES.pop("index", None),
+    "pages": r.build_main_and_pages,
+    "search": r.build_search,
+    "sitemap": r.build_sitemap_and_rss,
+    "tags": r.build_tags,
+    "related": r.build_related,
+    "shells": r.fix_root_shells,
+}
+POST_STEPS = {"posts", "rerender", "pages", "search", "sitemap", "tags", "related"}
+
+
+def plan(changed) -> list:
+    """Rebuild steps (in STEPS order) needed for a set of changed source paths."""
+    todo = set()
+    for rel in changed:
+        if rel == "config/config.json":  # base_url, posts_per_page, related_posts, ...
+            todo |= {"site", "rerender", "pages", "search", "sitemap", "tags", "related", "shells"}
+        elif rel == "config/ads.json":
+            todo.add("ads")
+        elif rel in rerender.TEMPLATE_FILES:
+            todo.add("rerender")
+            if rel.endswith("related.html"):
+                todo.add("related")
+        elif rel.startswith("assets/"):  # хэши меняются и в шаблоне страниц списка (page/2+)
+            todo |= {"assets", "index_template", "pages"}
+        elif rel == "data/posts.jsonl" or rel.startswith("blog-src/"):
+            todo |= POST_STEPS
+        elif rel == "index.html":  # index.html — ещё и шаблон страниц списка
+            todo |= {"index_template", "assets", "ads", "pages", "shells"}
+        elif rel in r.ROOT_SHELLS:
+            todo |= {"assets", "ads", "shells"}
+    return [name for name in STEPS if name in todo]
+
+
+def snapshot() -> dict:
+    """{rel path: (mtime_ns, size)} of every watched source file."""
+    files = {}
+    patterns = WATCH_GLOBS + list(r.ROOT_SHELLS)
+    for pattern in patterns:
+        for path in ROOT.glob(pattern):
+            if pattern == "assets/*" and (FINGERPRINTED_RE.match(path.name) or path.suffix in (".gz", ".br")):
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.is_file():
+                files[path.relative_to(ROOT).as_posix()] = (st.st_mtime_ns, st.st_size)
+    return files
+
+
+def diff(old, new) -> set:
+    return {rel for rel in old.keys() | new.keys() if old.get(rel) != new.get(rel)}
+
+
+def rebuild(steps):
+    """Run steps with the in-memory manifest; save it merged, like update_ads.py."""
+    r.MANIFEST = {**r.MANIFEST, **r.BUILT}
+    r.BUILT = {}
+    r.REPORT = {"written": [], "skipped": []}
+    for name in steps:
+        STEPS[name]()
+    save_manifest(r.MANIFEST_PATH, {**r.MANIFEST, **r.BUILT})
+    return r.REPORT["written"]
+
+
+def watch(interval):
+    seen = snapshot()
+    while True:
+        time.sleep(interval)
+        changed = diff(seen, current := snapshot())
+        if not changed:
+            continue
+        # ждём, пока редактор допишет файл(ы)
+        while True:
+            time.sleep(interval)
+            later = snapshot()
+            if later == current:
+                break
+            changed |= diff(current, later)
+            current = later
+        steps = plan(changed)
+        if not steps:
+            print(f"👀 {', '.join(sorted(changed))} changed (no outputs depend on it)")
+            seen = current
+            continue
+        print(f"👀 {', '.join(sorted(changed))} changed → {', '.join(steps)}")
+        t0 = time.perf_counter()
+        with BUILD_LOCK:
+            try:
+                written = rebuild(steps)
+            except Exception as e:  # сервер продолжает работать; правку можно исправить
+                print(f"⚠️ Rebuild failed: {e}")
+                written = None
+        after = snapshot()
+        # свои записи пропускаем, а правки, сделанные во время сборки, ловим на следующем круге
+        late = {rel for rel in diff(current, after) if rel not in SELF_WRITTEN}
+        seen = {**after, **{rel: current.get(rel) for rel in late}}
+        if written is not None:
+            print(f"✅ Rebuilt in {(time.perf_counter() - t0) * 1000:.0f} ms, {len(written)} files written")
+
+
+def under_base(path) -> bool:
+    return not r.BASE or path == r.BASE or path.startswith(r.BASE + "/")
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """Static files from ROOT, mounted at base_url like on GitHub Pages."""
+
+    def do_GET(self):
+        if not self._redirect_outside_base():
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self._redirect_outside_base():
+            super().do_HEAD()
+
+    def _redirect_outside_base(self) -> bool:
+        """302 to base_url for paths outside it (True if the response was sent)."""
+        if under_base(urlsplit(self.path).path):
+            return False
+        self.send_response(302)
+        self.send_header("Location", f"{r.BASE}/")
+        self.end_headers()
+        return True
+
+    def send_head(self):
+        # файл читается в память под замком, отправляется уже без него
+        with BUILD_LOCK:
+            f = super().send_head()
+            if f is None or isinstance(f, io.BytesIO):
+                return f
+            with f:
+                return io.BytesIO(f.read())
+
+    def translate_path(self, path):
+        path = urlsplit(path).path
+        if r.BASE and under_base(path):
+            path = path[len(r.BASE):] or "/"
+        return super().translate_path(path)
+
+    def end_headers(self):
+        self.send_header("Cache-Control", "no-cache")
+        super().end_headers()
+
+    def send_error(self, code, message=None, explain=None):
+        page = ROOT / "404.html"
+        if code != 404 or not page.exists():
+            return super().send_error(code, message, explain)
+        body = page.read_bytes()
+        self.send_response(404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--watch", action="store_true", help="Rebuild affected outputs when sources change")
+    parser.add_argument("--interval", type=float, default=0.5, help="Polling interval in seconds")
+    args = parser.parse_args()
+
+    r.load_site(ROOT)
+    if args.watch:
+        # одна инкрементальная сборка на старте, дальше — только затронутые шаги
+        r.MANIFEST = load_manifest(r.MANIFEST_PATH)
+        rebuild([name for name in STEPS if name not in ("site", "index_template")])
+        threading.Thread(target=watch, args=(args.interval,), daemon=True).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), partial(PreviewHandler, directory=str(ROOT)))
+    print(f"🌐 Serving {ROOT.name} at http://{args.host}:{args.port}{r.BASE}/" + (" (watching for changes)" if args.watch else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        r.close_pool()
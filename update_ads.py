@@ -1,11 +1,11 @@
-# Optional: if you ever baked ad placeholders into old posts and want to replace them in-place.
-import pathlib, re
+# Re-inline config/ads.json into already built pages without a full rebuild.
+# Only pages containing a slot whose HTML changed are rewritten (see rebuild_index.build_ads).
+import rebuild_index as r
+from writer.manifest import load_manifest, save_manifest
 
-ROOT = pathlib.Path(__file__).parent
-for html in ROOT.glob("posts/**/*.html"):
-    txt = html.read_text(encoding="utf-8")
-    # Example: replace old placeholder with slot include
-    txt2 = txt.replace("{{AD_CODE}}", '<div class="ad-slot" data-ad="slot2"></div>')
-    if txt2 != txt:
-        html.write_text(txt2, encoding="utf-8")
-        print("Updated ads in", html)
+if __name__ == "__main__":
+    r.load_site()
+    r.MANIFEST = load_manifest(r.MANIFEST_PATH)
+    r.build_ads()
+    save_manifest(r.MANIFEST_PATH, {**r.MANIFEST, **r.BUILT})
+    print(f"📝 {len(r.REPORT['written'])} files written, {len(r.REPORT['skipped'])} unchanged and skipped")
@@ -0,0 +1,68 @@
+import hashlib, json, os, re
+
+# Ads are resolved at build time: the HTML of each slot from config/ads.json is
+# written into the page's <div class="ad-slot" data-ad="..."> placeholder,
+# wrapped in <!-- ad:<slot>:<rev> --> ... <!-- /ad:<slot> --> so a later pass
+# can find and replace it. <rev> is a short hash of the slot HTML; a page only
+# needs rewriting when one of the slots it contains has a different rev.
+# assets/ad-loader.js stays as a fallback for placeholders that are still empty.
+ADS_FILE = "config/ads.json"
+LEGACY_PLACEHOLDER = "{{AD_CODE}}"  # старые посты (см. историю update_ads.py)
+
+SLOT_RE = re.compile(
+    r'(?P<open><div class="ad-slot" data-ad="(?P<slot>[\w-]+)"[^>]*>)'
+    r'(?:<!-- ad:(?P=slot):(?P<rev>[0-9a-f]+) -->.*?<!-- /ad:(?P=slot) -->)?'
+    r'(?P<close></div>)',
+    re.S,
+)
+
+_cache = {}  # path -> (mtime_ns, size, ads)
+
+
+def load_ads(root) -> dict:
+    """{slot: (rev, html)} from config/ads.json; {} when the file is missing or ads are disabled."""
+    path = os.path.join(root, ADS_FILE)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return {}
+    hit = _cache.get(path)
+    if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2]
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f) or {}
+    ads = {}
+    if config.get("enabled", True) is not False:
+        for slot, html in (config.get("slots") or {}).items():
+            ads[slot] = (hashlib.sha256(html.encode("utf-8")).hexdigest()[:8], html)
+    _cache[path] = (st.st_mtime_ns, st.st_size, ads)
+    return ads
+
+
+def page_slots(html: str) -> list:
+    """Ad slot names used by a page, in order."""
+    return [m["slot"] for m in SLOT_RE.finditer(html)]
+
+
+def slots_key(slots, ads) -> str:
+    """What a page with these slots must contain, e.g. "slot1=1a2b3c4d,slot2=-"."""
+    return ",".join(f"{slot}={ads[slot][0] if slot in ads else '-'}" for slot in slots)
+
+
+def inline_ads(html: str, ads: dict) -> str:
+    """Fill every ad placeholder with its current slot HTML (or empty it if the slot is gone)."""
+    if LEGACY_PLACEHOLDER in html:
+        html = html.replace(LEGACY_PLACEHOLDER, '<div class="ad-slot" data-ad="slot2"></div>')
+    if "ad-slot" not in html:
+        return html
+
+    def repl(m):
+        slot = m["slot"]
+        if slot not in ads:
+            return m["open"] + m["close"]
+        rev, body = ads[slot]
+        if m["rev"] == rev:
+            return m.group(0)
+        return f"{m['open']}<!-- ad:{slot}:{rev} -->{body}<!-- /ad:{slot} -->{m['close']}"
+
+    return SLOT_RE.sub(repl, html)
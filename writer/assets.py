@@ -0,0 +1,118 @@
+import gzip, hashlib, json, os, re
+
+from .atomic import atomic_write_text
+
+try:  # brotli — необязательная зависимость: без неё пишутся только .gz
+    import brotli
+except ImportError:
+    brotli = None
+
+# Build-time asset pipeline.
+#
+# Fingerprinting: every file directly in assets/ gets a copy named
+# <stem>.<hash>.<ext> (first HASH_LEN hex of its sha256) that can be cached
+# forever; data/asset-manifest.json maps "style.css" -> "style.1a2b3c4d5e.css".
+# rewrite_asset_refs() points /assets/<name> links in a page at the current
+# copy, whether the link was plain or an older fingerprint.
+#
+# Precompression: .gz (and .br when the brotli module is installed) siblings
+# for text outputs of at least COMPRESS_MIN bytes.
+ASSET_DIR = "assets"
+ASSET_MANIFEST = "data/asset-manifest.json"
+HASH_LEN = 10
+COMPRESS_MIN = 1024
+COMPRESS_EXT = (".html", ".xml", ".json", ".css", ".js", ".svg", ".txt")
+
+FINGERPRINTED_RE = re.compile(r"^(?P<stem>.+)\.[0-9a-f]{%d}(?P<ext>\.[^.]+)$" % HASH_LEN)
+ASSET_REF_RE = re.compile(r"(?<=assets/)(?P<stem>[\w-]+(?:\.[\w-]+)*?)(?:\.[0-9a-f]{%d})?(?P<ext>\.\w+)(?=[\"'?#\s)]|$)" % HASH_LEN)
+
+_cache = {}  # manifest path -> (mtime_ns, size, mapping)
+
+
+def fingerprint_name(name: str, data: bytes) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LEN]}{ext}"
+
+
+def fingerprint_assets(root):
+    """
+    Write fingerprinted copies of assets/*, drop stale ones and save the manifest.
+    Returns (mapping, written, removed) with paths relative to root.
+    """
+    folder = os.path.join(root, ASSET_DIR)
+    mapping, written, removed = {}, [], []
+    if not os.path.isdir(folder):
+        return mapping, written, removed
+    names = sorted(os.listdir(folder))
+    for name in names:
+        path = os.path.join(folder, name)
+        if not os.path.isfile(path) or FINGERPRINTED_RE.match(name) or name.endswith((".gz", ".br")):
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        hashed = fingerprint_name(name, data)
+        mapping[name] = hashed
+        target = os.path.join(folder, hashed)
+        if not os.path.exists(target):
+            with open(target, "wb") as f:
+                f.write(data)
+            written.append(f"{ASSET_DIR}/{hashed}")
+
+    current = set(mapping.values())
+    for name in names:
+        if FINGERPRINTED_RE.match(name) and name not in current:
+            os.remove(os.path.join(folder, name))
+            removed.append(f"{ASSET_DIR}/{name}")
+
+    path = os.path.join(root, ASSET_MANIFEST)
+    text = json.dumps(mapping, ensure_ascii=False, indent=2, sort_keys=True)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            unchanged = f.read() == text
+    except FileNotFoundError:
+        unchanged = False
+    if not unchanged:
+        atomic_write_text(path, text)
+    return mapping, written, removed
+
+
+def load_asset_map(root) -> dict:
+    """{"style.css": "style.<hash>.css"} from data/asset-manifest.json ({} before the first build)."""
+    path = os.path.join(root, ASSET_MANIFEST)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return {}
+    hit = _cache.get(path)
+    if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2]
+    with open(path, "r", encoding="utf-8") as f:
+        mapping = json.load(f)
+    _cache[path] = (st.st_mtime_ns, st.st_size, mapping)
+    return mapping
+
+
+def rewrite_asset_refs(html: str, mapping: dict) -> str:
+    """Point every .../assets/<name> reference at its fingerprinted copy."""
+    if not mapping or "assets/" not in html:
+        return html
+
+    def repl(m):
+        return mapping.get(m["stem"] + m["ext"], m.group(0))
+
+    return ASSET_REF_RE.sub(repl, html)
+
+
+def compress_file(path) -> list:
+    """Write <path>.gz (and <path>.br) next to path; returns the written paths."""
+    with open(path, "rb") as f:
+        data = f.read()
+    out = [(f"{path}.gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        out.append((f"{path}.br", brotli.compress(data, quality=11)))
+    for target, blob in out:
+        tmp = f"{target}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, target)
+    return [target for target, _ in out]
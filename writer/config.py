@@ -1,5 +1,10 @@
 import os, json
 
+from .dedupe import open_signatures
+from .poststore import open_store
+from .seen import SeenEntries
+from .state import read_state
+
 ROOT = os.path.dirname(os.path.dirname(__file__))
 
 def load_configs():
@@ -21,16 +26,17 @@ def load_configs():
         with open(feeds_path, "r", encoding="utf-8") as f:
             feeds_data = json.load(f)
         rss_feeds = feeds_data.get("rss_feeds", [])
+        feeds_fetch = feeds_data.get("fetch", {})
     else:
         rss_feeds = []
+        feeds_fetch = {}
+
+    # posts.jsonl (посты; при первом запуске переносятся из state.json)
+    store = open_store(ROOT)
 
-    # state.json (состояние блога)
+    # state.json (состояние блога: keyword_index, seen_entries)
     state_path = os.path.join(ROOT, "data/state.json")
-    if os.path.exists(state_path):
-        with open(state_path, "r", encoding="utf-8") as f:
-            state = json.load(f)
-    else:
-        state = {"posts": []}
+    state = read_state(state_path)
 
     return {
         "root": ROOT,
@@ -38,5 +44,9 @@ def load_configs():
         "writer_config": writer_config,
         "state_path": state_path,
         "state": state,
+        "store": store,
+        "signatures": open_signatures(ROOT),  # MinHash-подписи постов (data/signatures.jsonl)
+        "seen": SeenEntries(state),  # уже использованные записи RSS (state.json: seen_entries)
         "feeds": rss_feeds,
+        "feeds_fetch": feeds_fetch,
     }
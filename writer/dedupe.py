@@ -0,0 +1,190 @@
+import base64, json, os, re, struct, zlib
+from collections import defaultdict
+
+# Near-duplicate detection for generated articles.
+#
+# An article is reduced to its set of SHINGLE-word shingles and a MinHash
+# signature of NUM_PERM values; the share of equal values estimates the
+# Jaccard similarity of two articles. The signature uses one-permutation
+# hashing (every shingle is hashed once into one of NUM_PERM bins, the bin
+# keeps its minimum; empty bins borrow from the next filled one), which is one
+# pass over the shingles instead of NUM_PERM. Signatures live in data/signatures.jsonl
+# ({"url", "sig"} per line, appended like data/posts.jsonl) and are indexed
+# with LSH: BANDS bands of ROWS values each, bucketed by value, so a lookup
+# only compares against posts sharing at least one whole band instead of the
+# whole archive. With 32 x 4 a pair at similarity 0.5 becomes a candidate with
+# p ≈ 0.87, at 0.6 with p ≈ 0.99, at 0.2 with p ≈ 0.05.
+SIGNATURES_FILE = "data/signatures.jsonl"
+SHINGLE = 5
+NUM_PERM = 128
+BANDS, ROWS = 32, 4
+_MULT = 0x9E3779B97F4A7C15  # перемешивает crc32 в 64 бита; старшие биты — номер корзины
+_MASK64 = (1 << 64) - 1
+_BIN_SHIFT = 64 - (NUM_PERM.bit_length() - 1)
+_EMPTY = 1 << 32
+WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text) -> set:
+    """crc32 hashes of the lower-cased SHINGLE-word windows of text."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i:i + SHINGLE]).encode("utf-8")) for i in range(len(words) - SHINGLE + 1)}
+
+
+def signature(text) -> tuple:
+    """MinHash signature (NUM_PERM 32-bit values) of an article."""
+    bins = [_EMPTY] * NUM_PERM
+    for x in shingles(text):
+        h = ((x + 1) * _MULT) & _MASK64
+        b = h >> _BIN_SHIFT
+        v = (h >> 16) & 0xFFFFFFFF
+        if v < bins[b]:
+            bins[b] = v
+    filled = [i for i, v in enumerate(bins) if v != _EMPTY]
+    if len(filled) < NUM_PERM:
+        for i in range(NUM_PERM):
+            if bins[i] == _EMPTY:
+                j = next((k for k in filled if k > i), filled[0])
+                bins[i] = bins[j]
+    return tuple(bins)
+
+
+def similarity(sig_a, sig_b) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def encode(sig) -> str:
+    return base64.b64encode(struct.pack(f"<{NUM_PERM}I", *sig)).decode("ascii")
+
+
+def decode(text) -> tuple:
+    return struct.unpack(f"<{NUM_PERM}I", base64.b64decode(text))
+
+
+class DuplicateArticle(Exception):
+    """A generated article is too close to a post already in the archive."""
+
+
+def dedupe_options(configs):
+    """The "dedupe" settings from writer.json, or None when the check is off."""
+    opts = dict((configs.get("writer_config") or {}).get("dedupe", {}))
+    if opts.get("enabled", True) is False:
+        return None
+    action = opts.get("action", "regenerate")
+    if action not in ("regenerate", "reject", "warn"):
+        raise ValueError(f"dedupe.action must be regenerate, reject or warn, not {action!r}")
+    return {
+        "threshold": float(opts.get("threshold", 0.5)),
+        "action": action,
+        "attempts": max(1, int(opts.get("max_attempts", 2))),
+    }
+
+
+class SignatureIndex:
+    """MinHash signatures of every post + LSH buckets; loaded lazily."""
+
+    def __init__(self, path=None):
+        self.path = os.fspath(path) if path else None
+        self._pending = []
+        self._sigs = None
+
+    def _load(self):
+        if self._sigs is not None:
+            return
+        self._sigs = {}
+        self._buckets = defaultdict(list)
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        self._insert(rec["url"], decode(rec["sig"]))
+                    except (ValueError, KeyError, struct.error):
+                        continue  # обрезанная строка после сбоя
+        for url, sig in self._pending:
+            self._insert(url, sig)
+
+    def _insert(self, url, sig):
+        self._sigs[url] = sig
+        for band in range(BANDS):
+            self._buckets[(band, sig[band * ROWS:(band + 1) * ROWS])].append(url)
+
+    def __len__(self):
+        self._load()
+        return len(self._sigs)
+
+    def __contains__(self, url):
+        self._load()
+        return url in self._sigs
+
+    def query(self, sig, threshold=0.0) -> list:
+        """[(similarity, url)] of indexed posts at or above threshold, most similar first."""
+        self._load()
+        candidates = set()
+        for band in range(BANDS):
+            candidates.update(self._buckets.get((band, sig[band * ROWS:(band + 1) * ROWS]), ()))
+        found = [(similarity(sig, self._sigs[url]), url) for url in candidates]
+        return sorted((hit for hit in found if hit[0] >= threshold), reverse=True)
+
+    def add(self, url, sig, *, flush=True):
+        self._pending.append((url, sig))
+        if self._sigs is not None:
+            self._insert(url, sig)
+        if flush:
+            self.flush()
+
+    def discard(self, url):
+        """Forget a buffered (not yet flushed) signature, e.g. of a post that was never saved."""
+        kept = [(u, sig) for u, sig in self._pending if u != url]
+        if len(kept) == len(self._pending):
+            return
+        self._pending = kept
+        sig = self._sigs.pop(url, None) if self._sigs is not None else None
+        if sig is not None:
+            for band in range(BANDS):
+                bucket = self._buckets.get((band, sig[band * ROWS:(band + 1) * ROWS]))
+                if bucket and url in bucket:
+                    bucket.remove(url)
+
+    def flush(self):
+        """Append buffered signatures with a single write."""
+        if not self._pending or not self.path:
+            self._pending.clear()
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8", newline="\n") as f:
+            f.write("".join(json.dumps({"url": url, "sig": encode(sig)}) + "\n" for url, sig in self._pending))
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending.clear()
+
+    def backfill(self, src_dir) -> int:
+        """Index stored post sources (blog-src/posts/**.json) that have no signature yet; call flush() after."""
+        self._load()
+        added = 0
+        for folder, _, files in os.walk(src_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(folder, name)
+                # blog-src/posts/Y/M/D/<slug>.json -> /posts/Y/M/D/<slug>.html, без чтения файла
+                rel = os.path.relpath(path, src_dir).replace(os.sep, "/")
+                if f"/posts/{rel[:-len('.json')]}.html" in self._sigs:
+                    continue
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        src = json.load(f)
+                except ValueError:
+                    continue
+                url = src.get("url")
+                if url and url not in self._sigs and src.get("markdown"):
+                    self.add(url, signature(src["markdown"]), flush=False)
+                    added += 1
+        return added
+
+
+def open_signatures(root) -> SignatureIndex:
+    return SignatureIndex(os.path.join(root, SIGNATURES_FILE))
@@ -1,18 +1,26 @@
 import re, json
 
+from .metrics import timed
+
+def parse_faq(article_text):
+    """Return the (question, answer) pairs of the article's # FAQ section."""
+    faq_section = re.search(r"# FAQ(.*?)(# Sources|$)", article_text, re.S)
+    if not faq_section:
+        return []
+    faq_block = faq_section.group(1).strip()
+    qa_pairs = re.findall(r"Q:\s*(.*?)\nA:\s*(.*?)(?=\nQ:|\Z)", faq_block, re.S)
+    return [(q.strip(), a.strip()) for q, a in qa_pairs]
+
+@timed
 def extract_faq(article_text):
     faq_html, faq_entities = [], []
-    faq_section = re.search(r"# FAQ(.*?)(# Sources|$)", article_text, re.S)
-    if faq_section:
-        faq_block = faq_section.group(1).strip()
-        qa_pairs = re.findall(r"Q:\s*(.*?)\nA:\s*(.*?)(?=\nQ:|\Z)", faq_block, re.S)
-        for q, a in qa_pairs:
-            faq_html.append(f"<details><summary>{q.strip()}</summary><p>{a.strip()}</p></details>")
-            faq_entities.append({
-                "@type": "Question",
-                "name": q.strip(),
-                "acceptedAnswer": {"@type": "Answer", "text": a.strip()}
-            })
+    for q, a in parse_faq(article_text):
+        faq_html.append(f"<details><summary>{q}</summary><p>{a}</p></details>")
+        faq_entities.append({
+            "@type": "Question",
+            "name": q,
+            "acceptedAnswer": {"@type": "Answer", "text": a}
+        })
 
     faq_block_html, faq_block_jsonld = "", ""
     if faq_html:
@@ -1,28 +1,182 @@
-import os
-from openai import OpenAI
+import os, random, threading, time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 
-def call_openai(user_prompt, system_prompt):
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from .metrics import add as add_metrics, timed
+from .llm_cache import cache_options, cache_key, cache_get, cache_put
 
+# LLM call layer.
+#
+# Models come from writer.json ("model", "fallbackModel"); timing from its "llm"
+# block. Each request is streamed and has a deadline (whole response) and an
+# idle timeout (gap between chunks), so a hung call fails instead of stalling
+# the run. If the primary model has produced no token after hedge_after
+# seconds (or fails), the same request goes to the fallback model and whichever
+# completes first wins; the other stream is closed at its next chunk. Any
+# primary failure (a 400/404 included: the fallback may be a different
+# deployment) brings in the fallback. When every model fails, the attempt is
+# retried after a jittered exponential backoff if the last error is retriable
+# (timeouts, connection errors, 408/409/429/5xx).
+DEFAULT_MODEL = "gpt-5-mini"
+DEFAULT_FALLBACK = "gpt-5"
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class _Cancelled(Exception):
+    """The other model of a hedged pair already answered."""
+
+
+def get_client():
+    """Shared OpenAI client: one connection pool for every call in the process (thread-safe)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI  # тяжёлый импорт (~0.8 с) — только при первом вызове сети
+            # повторы делаем сами (с джиттером и хеджированием), встроенные отключены
+            _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _client
+
+
+def llm_options(configs=None) -> dict:
+    """Models and timing for LLM calls from writer.json."""
+    writer_config = (configs or {}).get("writer_config") or {}
+    opts = dict(writer_config.get("llm", {}))
+    model = writer_config.get("model") or DEFAULT_MODEL
+    fallback = writer_config.get("fallbackModel", DEFAULT_FALLBACK) or None
+    hedge_after = opts.get("hedge_after", 30)
+    return {
+        "model": model,
+        "fallback": fallback if fallback != model else None,
+        "deadline": float(opts.get("deadline", 300)),
+        "idle_timeout": float(opts.get("idle_timeout", 60)),
+        "hedge_after": float(hedge_after) if hedge_after is not None else None,
+        "retries": max(0, int(opts.get("retries", 2))),
+        "backoff": float(opts.get("backoff", 2)),
+        "backoff_max": float(opts.get("backoff_max", 30)),
+    }
+
+
+@timed
+def call_openai(user_prompt, system_prompt, configs=None):
+    # Ответ сначала ищем в кэше (data/llm-cache), сеть — только при промахе
+    opts = llm_options(configs)
+    cache = cache_options(configs)
+    key = cache_key(system_prompt, user_prompt, opts["model"])
+    if cache:
+        cached = cache_get(cache, key)
+        if cached is not None:
+            print("♻️ LLM response served from cache")
+            add_metrics(cache_hits=1)
+            return cached
+
+    content, model = _complete(user_prompt, system_prompt, opts)
+    if cache and content:
+        cache_put(cache, key, content, model)
+    return content
+
+
+def _retriable(ex) -> bool:
+    if isinstance(ex, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(ex, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    # APITimeoutError / APIConnectionError и прочие сетевые ошибки без HTTP-статуса
+    return type(ex).__name__ in ("APITimeoutError", "APIConnectionError")
+
+
+def _complete(user_prompt, system_prompt, opts):
+    """(content, model) — hedged attempts with jittered exponential backoff between them."""
+    attempts = opts["retries"] + 1
+    for attempt in range(1, attempts + 1):
+        try:
+            return _hedged(user_prompt, system_prompt, opts)
+        except Exception as e:
+            if attempt == attempts or not _retriable(e):
+                raise
+            # "full jitter": параллельные батч-вызовы не повторяют запрос одновременно
+            delay = random.uniform(0, min(opts["backoff_max"], opts["backoff"] * 2 ** (attempt - 1)))
+            print(f"⚠️ LLM call failed: {e}; retry {attempt}/{attempts - 1} in {delay:.1f}s")
+            add_metrics(retries=1)
+            time.sleep(delay)
+
+
+def _hedged(user_prompt, system_prompt, opts):
+    """One attempt: primary model, plus the fallback if the primary is slow to start or fails."""
+    cancel = threading.Event()
+    models = {}  # Future -> model
+    first_token = {}  # model -> Event
+
+    def launch(model):
+        fut, first_token[model] = Future(), threading.Event()
+        models[fut] = model
+        # daemon: зависший или проигравший запрос не держит процесс до своего таймаута
+        threading.Thread(
+            target=_run, daemon=True,
+            args=(fut, model, user_prompt, system_prompt, opts, cancel, first_token[model]),
+        ).start()
+
+    primary, fallback = opts["model"], opts["fallback"]
+    launch(primary)
+    started = time.monotonic()
+    can_hedge = fallback is not None
+    timer = opts["hedge_after"] if can_hedge else None
+    pending, error = set(models), None
+    while pending:
+        timeout = None if timer is None else max(0.0, started + timer - time.monotonic())
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for fut in done:
+            if fut.exception() is None:
+                cancel.set()
+                if models[fut] != primary:
+                    add_metrics(fallback_wins=1)
+                return fut.result(), models[fut]
+            error = fut.exception()
+            print(f"⚠️ {models[fut]} failed: {error}")
+        if not done:  # сработал таймер хеджирования
+            timer = None
+            if first_token[primary].is_set():
+                continue  # основная модель уже отвечает — ждём её
+        if can_hedge and (error is not None or not done):
+            reason = "failed" if error is not None else f"sent nothing in {opts['hedge_after']:g}s"
+            print(f"🔀 {primary} {reason}, hedging with {fallback}")
+            add_metrics(hedged=1)
+            can_hedge, timer = False, None
+            launch(fallback)
+            pending |= {f for f, m in models.items() if m == fallback}
+    raise error
+
+
+def _run(fut, model, user_prompt, system_prompt, opts, cancel, first_token):
+    try:
+        fut.set_result(_stream(model, user_prompt, system_prompt, opts, cancel, first_token))
+    except BaseException as e:
+        fut.set_exception(e)
+
+
+def _stream(model, user_prompt, system_prompt, opts, cancel, first_token) -> str:
+    """Stream one completion; raises TimeoutError past the deadline, _Cancelled if the other model won."""
+    deadline = time.monotonic() + opts["deadline"]
+    stream = get_client().chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        stream=True,
+        timeout=min(opts["idle_timeout"], opts["deadline"]),  # для потока — пауза между чанками
+    )
+    parts = []
     try:
-        # Основной вызов модели gpt-5-mini
-        resp = client.chat.completions.create(
-            model="gpt-5-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-        )
-        return resp.choices[0].message.content
-
-    except Exception as e:
-        # Фолбэк на gpt-5
-        print(f"⚠️ gpt-5-mini failed: {e}, retrying with gpt-5...")
-        resp = client.chat.completions.create(
-            model="gpt-5",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-        )
-        return resp.choices[0].message.content
+        for chunk in stream:
+            if cancel.is_set():
+                raise _Cancelled(model)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{model} did not finish within {opts['deadline']:g}s")
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                first_token.set()
+    finally:
+        stream.close()
+    return "".join(parts)
@@ -0,0 +1,124 @@
+import json, os, threading, time
+
+from .manifest import input_hash
+
+# LLM response cache: data/llm-cache/<2 hex>/<sha256>.json, keyed on
+# (system prompt, user prompt, model). Entries expire after ttl_days and the
+# least recently used ones are evicted once the directory exceeds max_mb.
+# The total size is kept in data/llm-cache/index.json and updated on every
+# put, so the directory is only walked when that counter crosses max_mb or
+# the last walk is older than SWEEP_EVERY (expired entries, counter drift
+# from concurrent processes). Eviction goes down to LOW_WATER of max_mb, so a
+# full cache is walked once per ~10% of its size written, not on every put.
+INDEX_FILE = "index.json"
+SWEEP_EVERY = 86400
+LOW_WATER = 0.9
+
+_index_lock = threading.Lock()
+
+
+def cache_options(configs):
+    """Return the cache settings from writer.json, or None when caching is off."""
+    if not configs or configs.get("no_cache"):
+        return None
+    opts = dict((configs.get("writer_config") or {}).get("cache", {}))
+    if opts.get("enabled", True) is False:
+        return None
+    return {
+        "dir": os.path.join(configs.get("root", "."), opts.get("dir", "data/llm-cache")),
+        "ttl": float(opts.get("ttl_days", 30)) * 86400,
+        "max_bytes": int(float(opts.get("max_mb", 50)) * 1024 * 1024),
+    }
+
+
+def cache_key(system_prompt, user_prompt, model) -> str:
+    return input_hash(system_prompt, user_prompt, model)
+
+
+def _entry_path(opts, key):
+    return os.path.join(opts["dir"], key[:2], f"{key}.json")
+
+
+def cache_get(opts, key):
+    """Cached response text for key, or None if missing or older than the TTL."""
+    path = _entry_path(opts, key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if time.time() - entry.get("created", 0) > opts["ttl"]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return None
+    os.utime(path)  # mtime = last use, for LRU eviction
+    return entry.get("content")
+
+
+def _read_index(opts):
+    try:
+        with open(os.path.join(opts["dir"], INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        return index if isinstance(index, dict) else None
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_index(opts, index):
+    path = os.path.join(opts["dir"], INDEX_FILE)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, path)
+
+
+def cache_put(opts, key, content, model):
+    path = _entry_path(opts, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        old_size = os.path.getsize(path)
+    except FileNotFoundError:
+        old_size = 0
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"model": model, "created": time.time(), "content": content}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+    with _index_lock:
+        index = _read_index(opts) or {}
+        index["bytes"] = index.get("bytes", 0) + os.path.getsize(path) - old_size
+        if index["bytes"] > opts["max_bytes"] or time.time() - index.get("swept", 0) > SWEEP_EVERY:
+            cache_evict(opts)  # обход каталога пересчитывает и счётчик
+        else:
+            _write_index(opts, index)
+
+
+def cache_evict(opts):
+    """Drop expired entries, then least recently used ones until under LOW_WATER * max_bytes; rewrites the size index."""
+    now, entries, total = time.time(), [], 0
+    for dirpath, _, files in os.walk(opts["dir"]):
+        for name in files:
+            if not name.endswith(".json") or name == INDEX_FILE:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+                if now - st.st_mtime > opts["ttl"]:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= opts["max_bytes"] * LOW_WATER:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    _write_index(opts, {"bytes": total, "swept": now})
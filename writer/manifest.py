@@ -0,0 +1,35 @@
+import hashlib, json
+
+from .atomic import atomic_write_text
+
+
+def input_hash(*parts) -> str:
+    """Return a stable sha256 over the inputs that feed one build output.
+
+    Strings and bytes are hashed as-is, everything else is serialized to
+    canonical JSON first, so the same posts/template always give the same key.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, (str, bytes)):
+            part = json.dumps(part, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def load_manifest(path) -> dict:
+    """Load {output path: input hash} from a manifest file ({} if missing or broken)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f) or {}
+    except (FileNotFoundError, ValueError):
+        return {}
+    outputs = data.get("outputs", {}) if isinstance(data, dict) else {}
+    return outputs if isinstance(outputs, dict) else {}
+
+
+def save_manifest(path, outputs: dict) -> None:
+    atomic_write_text(path, json.dumps({"version": 1, "outputs": dict(sorted(outputs.items()))}, ensure_ascii=False, indent=2))
@@ -0,0 +1,210 @@
+import io, re
+from html import escape
+from typing import NamedTuple
+
+# Single-pass Markdown → HTML for LLM articles. Lines are streamed once and
+# every block yields its HTML, its plain text (for the description) and its
+# word count together. Headings are shifted one level down (# → h2) because
+# the page <h1> is the post title.
+#
+# Blocks: # headings, paragraphs (blank-line separated), - * + bullet lists,
+# 1. / 1) ordered lists, > quotes, --- rules and ``` / ~~~ fenced code.
+# Inline: `code`, [text](url), bare http(s) links, **strong**, *em*, _em_.
+# URLs may contain one level of balanced parentheses (wiki/Paris_(city)).
+# All text and attributes are HTML-escaped; links with a scheme other than
+# http, https or mailto (javascript:, data:, ...) are rendered as plain text.
+
+HEADING_RE = re.compile(r"(#{1,6})\s+(.*?)\s*#*\s*$")
+UL_RE = re.compile(r"[-*+]\s+(.*)")
+OL_RE = re.compile(r"(\d{1,9})[.)]\s+(.*)")
+HR_RE = re.compile(r"(?:-\s*){3,}|(?:\*\s*){3,}|(?:_\s*){3,}")
+FENCE_RE = re.compile(r"(```+|~~~+)\s*([\w+-]*)")
+WORD_RE = re.compile(r"\w+")
+INLINE_RE = re.compile(
+    r"(?=[`\[h*_])"                                        # cheap first-char filter
+    r"(?:`([^`]+)`"                                        # 1 code
+    r"|\[([^\]]+)\]\(\s*((?:[^()\s]|\([^()\s]*\))+)\s*\)"  # 2,3 link
+    r"|(https?://(?:[^\s<>()]|\([^\s<>()]*\))*"             # 4 bare url
+    r"(?:[^\s<>().,;:!?'\"]|\([^\s<>()]*\)))"
+    r"|\*\*(.+?)\*\*|__(.+?)__"                            # 5,6 strong
+    r"|\*([^*\s](?:[^*]*[^*\s])?)\*"                       # 7 em
+    r"|(?<!\w)_([^_\s](?:[^_]*[^_\s])?)_(?!\w))"           # 8 em
+)
+
+
+class MarkdownResult(NamedTuple):
+    html: str
+    description: str  # leading plain text, up to desc_len characters
+    words: int
+    headings: list    # [(level, text)] with the Markdown level (1 = "#")
+
+
+SCHEME_RE = re.compile(r"([a-zA-Z][a-zA-Z0-9+.-]*):")
+SAFE_SCHEMES = {"http", "https", "mailto"}
+
+
+def _attr(url: str):
+    """Escaped href, or None for a scheme that is not http(s)/mailto (relative URLs are fine)."""
+    # браузер игнорирует управляющие символы и пробелы в схеме ("java\tscript:")
+    m = SCHEME_RE.match("".join(ch for ch in url if ch > " "))
+    if m and m.group(1).lower() not in SAFE_SCHEMES:
+        return None
+    return escape(url, quote=True)
+
+
+def render_inline(s: str):
+    """Return (html, plain text) for one run of inline Markdown."""
+    html, text, pos = [], [], 0
+    for m in INLINE_RE.finditer(s):
+        if m.start() > pos:
+            chunk = s[pos:m.start()]
+            html.append(escape(chunk, quote=False))
+            text.append(chunk)
+        code, link_text, link_url, url, strong1, strong2, em1, em2 = m.groups()
+        if code is not None:
+            html.append(f"<code>{escape(code, quote=False)}</code>")
+            text.append(code)
+        elif link_text is not None:
+            inner_html, inner_text = render_inline(link_text)
+            href = _attr(link_url)
+            html.append(f'<a href="{href}">{inner_html}</a>' if href is not None else inner_html)
+            text.append(inner_text)
+        elif url is not None:
+            html.append(f'<a href="{_attr(url)}">{escape(url, quote=False)}</a>')
+            text.append(url)
+        else:
+            strong = strong1 if strong1 is not None else strong2
+            inner = strong if strong is not None else (em1 if em1 is not None else em2)
+            tag = "strong" if strong is not None else "em"
+            inner_html, inner_text = render_inline(inner)
+            html.append(f"<{tag}>{inner_html}</{tag}>")
+            text.append(inner_text)
+        pos = m.end()
+    if pos < len(s):
+        html.append(escape(s[pos:], quote=False))
+        text.append(s[pos:])
+    return "".join(html), "".join(text)
+
+
+def convert(md, *, desc_len: int = 300) -> MarkdownResult:
+    """Convert Markdown (a string or any iterable of lines) in one pass."""
+    lines = io.StringIO(md) if isinstance(md, str) else md
+    out, headings = [], []
+    desc, desc_size, words = [], 0, 0
+    para, quote = [], []
+    list_tag = None
+    fence, fence_lang, code = None, "", []
+
+    def add_text(t):
+        nonlocal desc_size, words
+        words += len(WORD_RE.findall(t))
+        if desc_size < desc_len and t.strip():
+            piece = " ".join(t.split())
+            desc.append(piece)
+            desc_size += len(piece) + 1
+
+    def close_para():
+        if para:
+            html, text = render_inline("\n".join(para))
+            out.append(f"<p>{html}</p>")
+            add_text(text)
+            para.clear()
+
+    def close_quote():
+        if quote:
+            html, text = render_inline("\n".join(quote))
+            out.append(f"<blockquote><p>{html}</p></blockquote>")
+            add_text(text)
+            quote.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            out.append(f"</{list_tag}>")
+            list_tag = None
+
+    def close_blocks():
+        close_para(); close_quote(); close_list()
+
+    def open_list(tag, start=None):
+        nonlocal list_tag
+        if list_tag != tag:
+            close_blocks()
+            list_tag = tag
+            out.append(f'<ol start="{start}">' if tag == "ol" and start not in (None, 1) else f"<{tag}>")
+
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+
+        if fence:
+            if line.strip().startswith(fence):
+                cls = f' class="language-{_attr(fence_lang)}"' if fence_lang else ""
+                out.append(f"<pre><code{cls}>{escape(chr(10).join(code), quote=False)}</code></pre>")
+                words += sum(len(WORD_RE.findall(c)) for c in code)
+                fence, code = None, []
+            else:
+                code.append(line)
+            continue
+
+        stripped = line.strip()
+        if not stripped:
+            close_blocks()
+            continue
+
+        first = stripped[0]
+        if first in "`~":
+            m = FENCE_RE.match(stripped)
+            if m:
+                close_blocks()
+                fence, fence_lang = m.group(1), m.group(2)
+                continue
+
+        if first == "#":
+            m = HEADING_RE.match(stripped)
+            if m:
+                close_blocks()
+                level = len(m.group(1))
+                html, text = render_inline(m.group(2))
+                tag = f"h{min(level + 1, 6)}"
+                out.append(f"<{tag}>{html}</{tag}>")
+                headings.append((level, text))
+                add_text(text)
+                continue
+
+        if first in "-*_" and HR_RE.fullmatch(stripped):
+            close_blocks()
+            out.append("<hr>")
+            continue
+
+        if first in "-*+":
+            m = UL_RE.fullmatch(stripped)
+            if m:
+                open_list("ul")
+                html, text = render_inline(m.group(1))
+                out.append(f"<li>{html}</li>")
+                add_text(text)
+                continue
+
+        if first.isdigit():
+            m = OL_RE.fullmatch(stripped)
+            if m:
+                open_list("ol", int(m.group(1)))
+                html, text = render_inline(m.group(2))
+                out.append(f"<li>{html}</li>")
+                add_text(text)
+                continue
+
+        if first == ">":
+            close_para(); close_list()
+            quote.append(stripped[1:].strip())
+            continue
+
+        close_quote(); close_list()
+        para.append(stripped)
+
+    if fence:  # unterminated fence: keep the code
+        out.append(f"<pre><code>{escape(chr(10).join(code), quote=False)}</code></pre>")
+        words += sum(len(WORD_RE.findall(c)) for c in code)
+    close_blocks()
+
+    return MarkdownResult("\n".join(out), " ".join(desc)[:desc_len], words, headings)
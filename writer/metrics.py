@@ -0,0 +1,145 @@
+import functools, json, os, sys, threading, time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from .atomic import atomic_write_text
+
+# Per-run stage metrics for generate.py and rebuild_index.py.
+#
+# start_run() opens a run; every `with stage("name"):` block then adds its wall
+# time (summed over calls, so threads in batch mode add up) and any counters
+# passed to add() (files, bytes, items, ...) to the stage's totals.
+# finish_run() writes the report to data/metrics/<script>.json and appends it
+# as one line to data/metrics/<script>.jsonl. Without an open run stage() is a
+# no-op, so library code can be instrumented unconditionally
+# (@timed on a function = a stage named after it).
+#
+# With profile=True every stage call runs under its own cProfile.Profile
+# (unless one is already active in that thread); at the end the stats of the
+# slowest stage are saved to data/metrics/<script>-<stage>.prof and the top
+# entries are printed.
+METRICS_DIR = "data/metrics"
+PROFILE_TOP = 25
+
+_run = None
+_lock = threading.Lock()
+_local = threading.local()  # стек вложенных стадий текущего потока
+
+
+class _Run:
+    def __init__(self, script, root, profile):
+        self.script = script
+        self.root = root
+        self.profile = profile
+        self.started = datetime.now(timezone.utc)
+        self.t0 = time.perf_counter()
+        self.stages = {}    # name -> {"calls", "seconds", counters...}
+        self.profiles = {}  # name -> [cProfile.Profile]
+
+
+def start_run(script, root, *, profile=False):
+    global _run
+    _run = _Run(script, os.fspath(root), profile)
+
+
+@contextmanager
+def stage(name):
+    run = _run
+    if run is None:
+        yield
+        return
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    prof = None
+    if run.profile and not getattr(_local, "profiling", False):
+        import cProfile
+        prof = cProfile.Profile()
+        _local.profiling = True
+        prof.enable()
+    stack.append({})
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        counters = stack.pop()
+        if prof is not None:
+            prof.disable()
+            _local.profiling = False
+        with _lock:
+            totals = run.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+            totals["calls"] += 1
+            totals["seconds"] += dt
+            for key, value in counters.items():
+                totals[key] = totals.get(key, 0) + value
+            if prof is not None:
+                run.profiles.setdefault(name, []).append(prof)
+
+
+def timed(fn):
+    """Decorator: every call of fn is a stage named fn.__name__."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _run is None:
+            return fn(*args, **kwargs)
+        with stage(fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def add(**counters):
+    """Add counters (files=, bytes=, items=, ...) to the innermost open stage of this thread."""
+    stack = getattr(_local, "stack", None)
+    if _run is None or not stack:
+        return
+    current = stack[-1]
+    for key, value in counters.items():
+        current[key] = current.get(key, 0) + value
+
+
+def finish_run(**extra) -> dict:
+    """Write the report of the open run and close it; returns the report ({} without a run)."""
+    global _run
+    run, _run = _run, None
+    if run is None:
+        return {}
+    stages = [{"name": name, **{k: round(v, 4) if isinstance(v, float) else v for k, v in totals.items()}}
+              for name, totals in run.stages.items()]
+    slowest = max(stages, key=lambda s: s["seconds"])["name"] if stages else None
+    report = {
+        "script": run.script,
+        "started": run.started.isoformat(timespec="seconds"),
+        "seconds": round(time.perf_counter() - run.t0, 4),
+        "argv": sys.argv[1:],
+        **extra,
+        "slowest": slowest,
+        "stages": stages,
+    }
+    folder = os.path.join(run.root, METRICS_DIR)
+    os.makedirs(folder, exist_ok=True)
+    if run.profile and slowest in run.profiles:
+        report["profile"] = _dump_profile(run, slowest, folder)
+    atomic_write_text(os.path.join(folder, f"{run.script}.json"), json.dumps(report, ensure_ascii=False, indent=2))
+    with open(os.path.join(folder, f"{run.script}.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(report, ensure_ascii=False) + "\n")
+    return report
+
+
+def _dump_profile(run, name, folder) -> str:
+    import pstats
+    path = os.path.join(folder, f"{run.script}-{name}.prof")
+    stats = pstats.Stats(*run.profiles[name])
+    stats.dump_stats(path)
+    print(f"🔬 Profile of the slowest stage '{name}' → {os.path.relpath(path, run.root)}")
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+    return os.path.relpath(path, run.root).replace(os.sep, "/")
+
+
+def summary(report) -> str:
+    """One line per stage for the console."""
+    lines = []
+    for s in sorted(report.get("stages", []), key=lambda s: -s["seconds"]):
+        extra = ", ".join(f"{k} {v}" for k, v in s.items() if k not in ("name", "calls", "seconds"))
+        lines.append(f"   {s['name']:<24} {s['seconds'] * 1000:>9.1f} ms  ×{s['calls']}" + (f"  ({extra})" if extra else ""))
+    return "\n".join(lines)
@@ -0,0 +1,204 @@
+import bisect, json, os
+from collections import defaultdict
+
+from .atomic import atomic_write_text
+from .state import read_state, state_lock, write_state
+
+# Post store: data/posts.jsonl, one JSON post per line, oldest first.
+# New posts are appended (one line per post, small git diffs); a later line
+# with the same "url" replaces the earlier one and {"url": ..., "deleted": true}
+# removes it. compact()/rewrite() atomically rewrite the file with live posts.
+# The file is parsed lazily on the first query and indexed by url, tag and date.
+STORE_FILE = "data/posts.jsonl"
+STATE_FILE = "data/state.json"
+
+
+def _dumps(record) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+class PostStore:
+    def __init__(self, path=None, posts=None):
+        """Open the store at path; with posts (newest first) build an in-memory store instead."""
+        self.path = os.fspath(path) if path else None
+        self._pending = []
+        self._records = None
+        if posts is not None:
+            self._index(list(reversed(posts)))
+
+    # --- loading / indexes ---
+    def _load(self):
+        if self._records is not None:
+            return
+        records = []
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for n, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # обрезанная последняя строка после сбоя при дозаписи
+                        print(f"⚠️ Skipping broken line {n} in {self.path}")
+        self._index(records + self._pending)
+
+    def reload(self):
+        """Forget the parsed log (re-read lazily on the next query); buffered posts are kept."""
+        if self.path:
+            self._records = None
+
+    def _index(self, records):
+        self._records = []         # live posts in log order (oldest first)
+        self._by_url = {}          # url -> position in _records
+        self._dead = 0             # replaced/deleted lines, for compaction
+        for rec in records:
+            self._apply(rec)
+        self._reindex()
+
+    def _apply(self, rec):
+        url = rec.get("url")
+        pos = self._by_url.pop(url, None)
+        if pos is not None:
+            self._records[pos] = None
+            self._dead += 1
+        if rec.get("deleted"):
+            self._dead += 1
+            return
+        self._by_url[url] = len(self._records)
+        self._records.append(rec)
+
+    def _reindex(self):
+        if self._dead and None in self._records:
+            self._records = [r for r in self._records if r is not None]
+            self._by_url = {r.get("url"): i for i, r in enumerate(self._records)}
+        self._newest = None
+        self._by_tag = defaultdict(list)   # tag -> positions, oldest first
+        for i, rec in enumerate(self._records):
+            for t in rec.get("tags", []):
+                if isinstance(t, str) and t.strip():
+                    self._by_tag[t.strip()].append(i)
+        self._by_date = sorted((rec.get("date", ""), i) for i, rec in enumerate(self._records))
+
+    # --- queries ---
+    def __len__(self):
+        self._load()
+        return len(self._records)
+
+    def posts(self) -> list:
+        """All posts, newest first (the order state.json "posts" used to have)."""
+        self._load()
+        if self._newest is None:
+            self._newest = self._records[::-1]
+        return self._newest
+
+    def get(self, url):
+        self._load()
+        pos = self._by_url.get(url)
+        return None if pos is None else self._records[pos]
+
+    def by_tag(self, tag) -> list:
+        """Posts with tag, newest first."""
+        self._load()
+        return [self._records[i] for i in reversed(self._by_tag.get(tag, []))]
+
+    def tags(self) -> dict:
+        """{tag: post count}."""
+        self._load()
+        return {tag: len(ids) for tag, ids in self._by_tag.items()}
+
+    def tag_index(self) -> dict:
+        """{tag: [positions in posts()]}, newest first — one pass, built at load time."""
+        self._load()
+        last = len(self._records) - 1
+        return {tag: [last - i for i in reversed(ids)] for tag, ids in self._by_tag.items()}
+
+    def between(self, start="", end="\uffff") -> list:
+        """Posts with start <= date <= end (ISO strings), oldest date first."""
+        self._load()
+        lo = bisect.bisect_left(self._by_date, (start, -1))
+        hi = bisect.bisect_right(self._by_date, (end, len(self._records)))
+        return [self._records[i] for _, i in self._by_date[lo:hi]]
+
+    # --- writes ---
+    def add(self, post, *, flush=True):
+        """Append a post (replacing any post with the same url)."""
+        rec = dict(post)
+        self._pending.append(rec)
+        if self._records is not None:
+            replaced = rec.get("url") in self._by_url
+            self._apply(rec)
+            if replaced or rec.get("deleted"):
+                self._reindex()
+            else:
+                i = len(self._records) - 1
+                for t in rec.get("tags", []):
+                    if isinstance(t, str) and t.strip():
+                        self._by_tag[t.strip()].append(i)
+                bisect.insort(self._by_date, (rec.get("date", ""), i))
+                self._newest = None
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """Append pending posts to the log with a single write + fsync."""
+        if not self._pending or not self.path:
+            self._pending.clear()
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8", newline="\n") as f:
+            f.write("".join(_dumps(rec) + "\n" for rec in self._pending))
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending.clear()
+
+    def rewrite(self, posts):
+        """Replace the whole store with posts (newest first), atomically."""
+        self._pending.clear()
+        self._index(list(reversed(posts)))
+        if self.path:
+            atomic_write_text(self.path, "".join(_dumps(rec) + "\n" for rec in self._records))
+
+    def compact(self):
+        """Drop replaced and deleted lines from the log."""
+        self._load()
+        if self._dead:
+            self.rewrite(self.posts())
+
+
+def open_store(root) -> PostStore:
+    """Open data/posts.jsonl under root, migrating posts out of data/state.json first."""
+    store_path = os.path.join(root, STORE_FILE)
+    state_path = os.path.join(root, STATE_FILE)
+    try:
+        legacy = "posts" in read_state(state_path)
+    except ValueError:
+        legacy = False
+    if legacy:
+        with state_lock(root):
+            migrate_state(state_path, store_path)
+    return PostStore(store_path)
+
+
+def migrate_state(state_path, store_path) -> int:
+    """
+    Move state["posts"] (newest first) into the post store and drop the key
+    from state.json. Posts whose url is already in the store are skipped.
+    Returns the number of migrated posts.
+    """
+    try:
+        state = read_state(state_path)
+    except ValueError:
+        return 0
+    if "posts" not in state:
+        return 0
+
+    store = PostStore(store_path)
+    new = [p for p in reversed(state.get("posts") or []) if store.get(p.get("url")) is None]
+    for p in new:
+        store.add(p, flush=False)
+    store.flush()
+    del state["posts"]
+    write_state(state_path, state)
+    print(f"🗃️ Migrated {len(new)} posts from {os.path.basename(state_path)} to {os.path.basename(store_path)}")
+    return len(new)
@@ -1,3 +1,7 @@
+from .metrics import timed
+
+
+@timed
 def build_prompt(keyword, summaries, configs):
     writer_config = configs["writer_config"]
     SECTIONS = writer_config.get("sections", [
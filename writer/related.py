@@ -0,0 +1,182 @@
+import heapq, json, math, os
+from collections import Counter, defaultdict
+from html import escape
+
+from .manifest import input_hash
+from .search_index import tokenize
+
+# Related posts, precomputed at rebuild time into data/related.json and baked
+# into post pages between RELATED_START/RELATED_END (no client-side fetch).
+#
+# Every post is a TF-IDF vector over title (x2), tags (x2) and description,
+# cut to its MAX_TERMS strongest terms; once there are MIN_DF_POSTS posts,
+# terms found in more than MAX_DF of them (e.g. "luggage" on this blog) carry
+# no signal and are dropped. An inverted index term -> postings (sorted by
+# weight, capped at MAX_POSTINGS) turns the top-k search into sparse dot
+# products with the posts that share a strong term, instead of N x N.
+#
+# Only new posts are scored on an ordinary run: each one gets its own top-k
+# and is merged into the lists of the posts it scored against. Removed or
+# edited posts, a different k, or corpus growth past REFRESH_GROWTH since the
+# last full pass (idf drift) trigger a full recompute.
+RELATED_FILE = "data/related.json"
+RELATED_START = "<!-- related:start -->"
+RELATED_END = "<!-- related:end -->"
+VERSION = 1
+MAX_TERMS = 10
+MAX_POSTINGS = 64
+MAX_DF = 0.5
+MIN_DF_POSTS = 200
+REFRESH_GROWTH = 1.1
+
+_cache = {}  # path -> (mtime_ns, size, data)
+
+
+def post_key(post) -> str:
+    """Hash of the fields the similarity is computed from (+ title, shown in the list)."""
+    return input_hash(post.get("title", ""), post.get("description", ""), post.get("tags", []))
+
+
+def _terms(post) -> Counter:
+    tf = Counter(tokenize(post.get("description", "")))
+    for token in tokenize(post.get("title", "")):
+        tf[token] += 2
+    for tag in post.get("tags", []):
+        if isinstance(tag, str):
+            for token in tokenize(tag):
+                tf[token] += 2
+    return tf
+
+
+class _Model:
+    """TF-IDF vectors + inverted index for one corpus."""
+
+    def __init__(self, posts):
+        tfs = [_terms(p) for p in posts]
+        df = Counter(t for tf in tfs for t in tf)
+        n = len(posts)
+        max_df = MAX_DF * n if n >= MIN_DF_POSTS else n
+        idf = {t: math.log((n + 1) / (d + 1)) + 1.0 for t, d in df.items() if d <= max_df}
+
+        self.vectors = []
+        postings = defaultdict(list)
+        for i, tf in enumerate(tfs):
+            weights = heapq.nlargest(MAX_TERMS, ((c * idf[t], t) for t, c in tf.items() if t in idf))
+            norm = math.sqrt(sum(w * w for w, _ in weights)) or 1.0
+            vec = [(t, w / norm) for w, t in weights]
+            self.vectors.append(vec)
+            for t, w in vec:
+                postings[t].append((w, i))
+        self.index = {t: heapq.nlargest(MAX_POSTINGS, plist) for t, plist in postings.items()}
+
+    def scores(self, i) -> dict:
+        """{doc: cosine} for the docs sharing a term with doc i."""
+        acc = defaultdict(float)
+        for t, w in self.vectors[i]:
+            for wj, j in self.index[t]:
+                if j != i:
+                    acc[j] += w * wj
+        return acc
+
+
+def _top(acc, k) -> list:
+    return heapq.nlargest(k, acc.items(), key=lambda kv: (kv[1], -kv[0]))
+
+
+def update_related(posts, previous=None, *, k=5):
+    """
+    Bring related-post lists up to date for posts (any order).
+    previous is the last data/related.json content ({} for a full run).
+    Returns (data, changed) — the new file content and the urls whose list changed.
+    """
+    previous = previous or {}
+    posts = [p for p in posts if isinstance(p.get("url"), str)]
+    urls = [p["url"] for p in posts]
+    keys = {p["url"]: post_key(p)[:16] for p in posts}
+    old_keys = previous.get("posts", {})
+    old_related = previous.get("related", {})
+
+    new = [i for i, url in enumerate(urls) if url not in old_keys]
+    full = (
+        previous.get("version") != VERSION
+        or previous.get("k") != k
+        or any(url not in keys or keys[url] != key for url, key in old_keys.items())
+        or len(posts) > previous.get("full_size", 0) * REFRESH_GROWTH
+    )
+
+    model = _Model(posts)
+    related = {}
+    if full:
+        for i, url in enumerate(urls):
+            related[url] = [[urls[j], posts[j].get("title", ""), round(s, 4)] for j, s in _top(model.scores(i), k)]
+        full_size = len(posts)
+    else:
+        related = {url: list(old_related.get(url, [])) for url in urls}
+        for i in new:
+            acc = model.scores(i)
+            related[urls[i]] = [[urls[j], posts[j].get("title", ""), round(s, 4)] for j, s in _top(acc, k)]
+            for j, s in acc.items():
+                lst = related[urls[j]]
+                s = round(s, 4)
+                if len(lst) < k or s > lst[-1][2]:
+                    lst.append([urls[i], posts[i].get("title", ""), s])
+                    lst.sort(key=lambda e: -e[2])
+                    del lst[k:]
+        full_size = previous.get("full_size", len(posts))
+
+    def shown(entries):
+        return [e[:2] for e in entries or []]
+
+    changed = {url for url in urls if shown(related[url]) != shown(old_related.get(url))}
+    data = {
+        "version": VERSION,
+        "k": k,
+        "full_size": full_size,
+        "posts": keys,
+        "related": related,
+    }
+    return data, changed
+
+
+def load_related(path) -> dict:
+    """Load data/related.json ({} if missing), cached while the file is unchanged."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return {}
+    hit = _cache.get(path)
+    if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except ValueError:
+        data = {}
+    _cache[path] = (st.st_mtime_ns, st.st_size, data)
+    return data
+
+
+def related_block(template, entries, base="") -> str:
+    """Marker-wrapped related-posts section (just the markers when there are none)."""
+    if not entries:
+        return RELATED_START + RELATED_END
+    items = "\n".join(
+        f'    <li><a href="{escape(base + url, quote=True)}">{escape(title, quote=False)}</a></li>'
+        for url, title, _ in entries
+    )
+    return RELATED_START + template.render({"items": items}) + RELATED_END
+
+
+def patch_related(html, block):
+    """
+    Replace the marker-wrapped block in a post page. Pages rendered before the
+    markers existed get the block before </article>; None if there is no place for it.
+    """
+    start = html.find(RELATED_START)
+    end = html.find(RELATED_END, start)
+    if start >= 0 and end >= 0:
+        return html[:start] + block + html[end + len(RELATED_END):]
+    pos = html.rfind("</article>")
+    if pos < 0:
+        return None
+    return html[:pos] + block + "\n" + html[pos:]
@@ -0,0 +1,57 @@
+import re
+from collections import defaultdict
+
+# Client search index (feeds/search/):
+#   meta.json        — shard list and doc chunk size, size bounded by the alphabet
+#   t-<prefix>.json  — {term: delta-encoded post ids} for terms starting with <prefix>
+#   docs-<n>.json    — [title, url, date, description] rows for ids n*DOC_CHUNK...
+# Post ids are chronological (oldest = 0), so a new post only touches the
+# shards of its own terms and the last docs chunk.
+TOKEN_RE = re.compile(r"[^\W_]+")
+PREFIX_LEN = 2
+DOC_CHUNK = 500
+DESC_LEN = 160
+
+
+def tokenize(text: str) -> list:
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if len(t) >= PREFIX_LEN]
+
+
+def shard_name(term: str) -> str:
+    """Filesystem-safe shard name for the first PREFIX_LEN chars (mirrored in assets/search.js)."""
+    prefix = term[:PREFIX_LEN]
+    if re.fullmatch(r"[a-z0-9]+", prefix):
+        return prefix
+    return "x" + prefix.encode("utf-8").hex()
+
+
+def build_search_index(posts) -> tuple:
+    """Build (meta, shards, chunks) for posts given newest first like PostStore.posts()."""
+    total = len(posts)
+    postings = defaultdict(set)
+    chunks = [[] for _ in range(-(-total // DOC_CHUNK))]
+    for doc_id, p in enumerate(reversed(posts)):
+        tags = [t for t in p.get("tags", []) if isinstance(t, str)]
+        text = " ".join([p.get("title", ""), p.get("description", ""), *tags])
+        for term in set(tokenize(text)):
+            postings[term].add(doc_id)
+        chunks[doc_id // DOC_CHUNK].append([
+            p.get("title", "Untitled"),
+            p.get("url", ""),
+            p.get("date", ""),
+            (p.get("description", "") or "")[:DESC_LEN],
+        ])
+
+    shards = defaultdict(dict)
+    for term in sorted(postings):
+        ids = sorted(postings[term])
+        shards[shard_name(term)][term] = [b - a for a, b in zip([0] + ids, ids)]
+
+    meta = {
+        "version": 1,
+        "total": total,
+        "prefix": PREFIX_LEN,
+        "chunk": DOC_CHUNK,
+        "shards": sorted(shards),
+    }
+    return meta, dict(shards), chunks
@@ -0,0 +1,54 @@
+import hashlib
+
+# RSS entries already used as a news signal, kept in data/state.json.
+# An entry is identified by a short hash of its GUID (or link when the feed has
+# no GUIDs). Hashes live in two generations: "seen_entries" (current) and
+# "seen_entries_prev"; when the current one reaches GENERATION hashes it becomes
+# the previous one and the oldest generation is dropped, so the index never
+# holds more than 2 x GENERATION hashes (under 50 KB of state.json) while anything
+# used in the last GENERATION picks is still remembered. Lookups are set hits.
+SEEN_KEY = "seen_entries"
+PREV_KEY = "seen_entries_prev"
+GENERATION = 1000
+KEY_LEN = 16  # hex = 64 бита: коллизии на таком объёме практически невозможны
+
+
+def entry_key(guid_or_link: str) -> str:
+    return hashlib.sha1(guid_or_link.strip().encode("utf-8")).hexdigest()[:KEY_LEN]
+
+
+class SeenEntries:
+    """Two-generation set of used entry hashes; add() buffers, flush(state) merges under the state lock."""
+
+    def __init__(self, state=None):
+        self._pending = []
+        self._load(state or {})
+
+    def _load(self, state):
+        self._current = set(state.get(SEEN_KEY) or [])
+        self._previous = set(state.get(PREV_KEY) or [])
+
+    def __contains__(self, key):
+        return key in self._current or key in self._previous or key in self._pending
+
+    def __len__(self):
+        return len(self._current | self._previous)
+
+    def add(self, key):
+        if key not in self:
+            self._pending.append(key)
+
+    def flush(self, state):
+        """Merge buffered hashes into a fresh read of state (rotating if needed)."""
+        self._load(state)
+        if not self._pending:
+            return
+        for key in self._pending:
+            if key in self._current or key in self._previous:
+                continue
+            if len(self._current) >= GENERATION:
+                self._previous, self._current = self._current, set()
+            self._current.add(key)
+        self._pending.clear()
+        state[SEEN_KEY] = sorted(self._current)
+        state[PREV_KEY] = sorted(self._previous)
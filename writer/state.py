@@ -0,0 +1,108 @@
+import json, os, threading, time
+from contextlib import contextmanager
+
+from .atomic import atomic_write_text
+
+# Shared access to data/state.json and data/posts.jsonl.
+# generate.py and rebuild_index.py may run at the same time in one job, so every
+# read-modify-write happens under an advisory lock on data/.state.lock
+# (fcntl.flock on POSIX, msvcrt.locking on Windows) and state.json is only
+# ever replaced atomically (temp file + fsync + rename).
+LOCK_FILE = "data/.state.lock"
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_thread_lock = threading.RLock()
+_held = {}  # lock path -> nesting depth in this process
+
+
+def _try_lock(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def state_lock(root, timeout: float = 300.0):
+    """Hold the exclusive state lock for root (re-entrant within one process)."""
+    path = os.path.join(root, LOCK_FILE)
+    with _thread_lock:
+        if _held.get(path):
+            _held[path] += 1
+            try:
+                yield
+            finally:
+                _held[path] -= 1
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a+") as f:
+            deadline = time.monotonic() + timeout
+            waiting = False
+            while True:
+                try:
+                    _try_lock(f)
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"State lock {path} is still held after {timeout:g}s")
+                    if not waiting:
+                        print(f"⏳ Waiting for {LOCK_FILE} (another generate/rebuild is running)")
+                        waiting = True
+                    time.sleep(0.1)
+            _held[path] = 1
+            try:
+                yield
+            finally:
+                _held[path] = 0
+                _unlock(f)
+
+
+def read_state(path) -> dict:
+    """Load state.json ({} if missing or empty)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def write_state(path, state: dict) -> None:
+    atomic_write_text(path, json.dumps(state, ensure_ascii=False, indent=2))
+
+
+@contextmanager
+def state_transaction(configs):
+    """
+    Lock, re-read state.json and yield it for changes; on exit append buffered
+    posts to the store and write state.json once (only if it changed).
+    Changes made by other processes since load_configs() are kept.
+    """
+    path = configs["state_path"]
+    store = configs.get("store")
+    with state_lock(configs.get("root", ".")):
+        state = read_state(path)
+        before = json.dumps(state, sort_keys=True)
+        if store is not None:
+            store.reload()
+        yield state
+        if store is not None:
+            store.flush()
+        if json.dumps(state, sort_keys=True) != before:
+            write_state(path, state)
+        configs["state"] = state
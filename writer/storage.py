@@ -1,7 +1,11 @@
-import os, json, re, random, feedparser
+import os, json, queue, random, threading, time
+from concurrent.futures import Future, wait
 from datetime import datetime
-from bs4 import BeautifulSoup
+from .atomic import atomic_write_text
+from . import metrics
 from .render import slugify
+from .seen import entry_key
+from .state import state_transaction
 
 
 def build_post_slug(title, when=None):
@@ -15,10 +19,49 @@ def build_post_slug(title, when=None):
     return f"{base_slug}-{when.strftime('%H%M%S')}", when
 
 
-def save_post(title, html, configs, *, slug, published_at=None):
+@metrics.timed
+def commit_state(configs, **changes):
     """
-    Save a post to posts/YYYY/MM/DD/<slug>.html
-    and update data/state.json (prepend newest).
+    Under the state lock: append buffered posts to data/posts.jsonl (and their
+    signatures to data/signatures.jsonl) and apply `changes` (e.g. keyword_index=3)
+    to a fresh read of data/state.json, written once and atomically, together
+    with the RSS entries marked as used (seen_entries).
+    """
+    with state_transaction(configs) as state:
+        state.update(changes)
+        if configs.get("seen") is not None:
+            configs["seen"].flush(state)
+        if configs.get("signatures") is not None:
+            configs["signatures"].flush()
+
+
+def post_url(published_at, slug):
+    return (
+        f"/posts/{published_at.year:04d}/"
+        f"{published_at.month:02d}/"
+        f"{published_at.day:02d}/{slug}.html"
+    )
+
+
+def source_path(root, published_at, slug):
+    """blog-src/posts/YYYY/MM/DD/<slug>.json — the Markdown a post page is rendered from."""
+    return os.path.join(
+        root, "blog-src", "posts",
+        f"{published_at.year:04d}", f"{published_at.month:02d}", f"{published_at.day:02d}",
+        f"{slug}.json",
+    )
+
+
+@metrics.timed
+def save_post(title, post, configs, *, slug, published_at=None, commit=True, source=None):
+    """
+    Save a rendered post (writer.render.RenderedPost) to posts/YYYY/MM/DD/<slug>.html
+    and append it to the post store (data/posts.jsonl). The index description
+    comes from the render result, so the page is never parsed back.
+    With commit=False the post is only buffered; the caller flushes it
+    together with its state.json changes via commit_state().
+    `source` ({"markdown", "faq_html", "faq_jsonld"}) is stored next to the
+    metadata in blog-src/ so rerender.py can rebuild the page without the LLM.
     """
     published_at = published_at or datetime.today()
     folder = os.path.join(
@@ -33,84 +76,195 @@ def save_post(title, html, configs, *, slug, published_at=None):
 
     filepath = os.path.join(folder, f"{slug}.html")
     with open(filepath, "w", encoding="utf-8") as f:
-        f.write(html)
+        f.write(post.html)
+    metrics.add(files=1, bytes=os.path.getsize(filepath))
 
-    url = (
-        f"/posts/{published_at.year:04d}/"
-        f"{published_at.month:02d}/"
-        f"{published_at.day:02d}/{slug}.html"
-    )
+    url = post_url(published_at, slug)
+
+    if source is not None:
+        src_path = source_path(configs.get("root", "."), published_at, slug)
+        os.makedirs(os.path.dirname(src_path), exist_ok=True)
+        with open(src_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "title": title,
+                "slug": slug,
+                "url": url,
+                "published_at": published_at.isoformat(),
+                **source,
+            }, f, ensure_ascii=False, indent=2)
+        metrics.add(files=1, bytes=os.path.getsize(src_path))
 
     # Short description for index
-    try:
-        desc = BeautifulSoup(html, "html.parser").find("article").get_text(" ", strip=True)
-        desc = re.sub(r"\s+", " ", desc)[:200]
-    except Exception:
-        desc = f"{title} article"
-
-    # Update state.json
-    state_path = configs["state_path"]
-    state = configs.get("state") or {}
-    state.setdefault("posts", [])
-
-    # Prepend newest
-    state["posts"].insert(0, {
+    desc = post.description or f"{title} article"
+
+    # Append to the post store (newest = last line)
+    configs["store"].add({
         "title": title,
         "url": url,
         "date": published_at.strftime("%Y-%m-%d"),
         "description": desc,
         "tags": ["auto"]
-    })
+    }, flush=False)
 
     # ❌ Больше нет агрессивной фильтрации старых постов.
-    # Все старые записи остаются в state.json, даже если файл временно отсутствует.
+    # Все старые записи остаются в хранилище, даже если файл временно отсутствует.
+
+    if not commit:
+        print(f"✅ Saved post to {filepath}")
+        return
+
+    commit_state(configs)
+    print(f"✅ Saved post to {filepath} and updated posts.jsonl")
+
+
+def _entry_candidates(feed):
+    """First 5 usable entries of a parsed feed as [epoch, title, link, key] (key = hash of GUID or link)."""
+    out = []
+    for e in (feed.entries or [])[:5]:
+        title = getattr(e, "title", "") or ""
+        link = getattr(e, "link", "") or ""
+        if not title or not link:
+            continue
+        # Try to get a datetime; feedparser puts it in 'published_parsed' or 'updated_parsed'
+        ts = getattr(e, "published_parsed", None) or getattr(e, "updated_parsed", None)
+        epoch = 0
+        if ts:
+            try:
+                epoch = int(datetime(*ts[:6]).timestamp())
+            except Exception:
+                epoch = 0
+        guid = getattr(e, "id", "") or link
+        out.append([epoch, title, link, entry_key(guid)])
+    return out
 
-    with open(state_path, "w", encoding="utf-8") as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
 
-    print(f"✅ Saved post to {filepath} and updated state.json")
+def _fetch_feed(url, cached, timeout, until=None):
+    """
+    Conditional GET of one feed. Returns a cache record
+    {"etag", "modified", "fetched", "entries"}; on 304 the cached entries are reused.
+    `timeout` bounds each socket operation; `until` (time.monotonic()) bounds the
+    whole download, so a feed that drips a few bytes at a time raises TimeoutError.
+    """
+    import feedparser, urllib.error, urllib.request  # только когда реально качаем ленты
+    headers = {"User-Agent": feedparser.USER_AGENT}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("modified"):
+        headers["If-Modified-Since"] = cached["modified"]
+    req = urllib.request.Request(url, headers=headers)
+    if until is not None:
+        timeout = max(0.1, min(timeout, until - time.monotonic()))
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            parts = []
+            # read1: не больше одного чтения из сокета, бюджет проверяем между ними
+            while chunk := resp.read1(65536):
+                parts.append(chunk)
+                if until is not None and time.monotonic() > until:
+                    raise TimeoutError(f"{url} still downloading after the deadline")
+            body = b"".join(parts)
+            etag, modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    except urllib.error.HTTPError as ex:
+        if ex.code == 304 and "entries" in cached:
+            return {**cached, "fetched": int(time.time())}
+        raise
+    return {
+        "etag": etag,
+        "modified": modified,
+        "fetched": int(time.time()),
+        "entries": _entry_candidates(feedparser.parse(body)),
+    }
 
 
+def _load_feed_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+@metrics.timed
 def fetch_news_from_rss(configs):
     """
     Fetch a headline + link from configured RSS feeds.
     Strategy:
       - Shuffle feeds for variability.
+      - Fetch all feeds concurrently (daemon threads) with a per-read timeout and
+        an overall deadline that also bounds each download; ETag/Last-Modified
+        from the feed cache turn unchanged feeds into 304s.
+      - Feeds that fail or miss the deadline fall back to their cached entries.
       - Collect first 3–5 entries from each feed (if available).
-      - Pick the most recent by published date; fallback to the first available.
+      - Skip entries already used by earlier runs (seen_entries in state.json).
+      - Pick the most recent unseen one by published date and mark it as used;
+        the mark is persisted by the next commit_state().
     Returns (title, summary_line).
     """
     feeds = list(configs.get("feeds", [])) or []
     if not feeds:
         return "demo keyword", "Headline — Source"
 
+    opts = configs.get("feeds_fetch", {}) or {}
+    timeout = float(opts.get("timeout", 10))
+    deadline = float(opts.get("deadline", 30))
+    workers = max(1, int(opts.get("workers", 8)))
+    cache_path = os.path.join(configs.get("root", "."), opts.get("cache", "data/feeds-cache.json"))
+    cache = _load_feed_cache(cache_path)
+
     random.shuffle(feeds)
-    candidates = []
+    until = time.monotonic() + deadline
+    futures = {url: Future() for url in feeds}
+    todo = queue.SimpleQueue()
+    for url in feeds:
+        todo.put(url)
+
+    def worker():
+        while time.monotonic() < until:
+            try:
+                url = todo.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                futures[url].set_result(_fetch_feed(url, cache.get(url, {}), timeout, until))
+            except BaseException as ex:
+                futures[url].set_exception(ex)
 
+    # daemon: зависшая лента не держит процесс после дедлайна (пул потоков ждал бы их на выходе)
+    for _ in range(min(workers, len(feeds))):
+        threading.Thread(target=worker, daemon=True).start()
+    wait(futures.values(), timeout=deadline)
+
+    seen = configs.get("seen")
+    candidates, skipped = [], 0
     for url in feeds:
-        try:
-            feed = feedparser.parse(url)
-            for e in (feed.entries or [])[:5]:
-                title = getattr(e, "title", "") or ""
-                link = getattr(e, "link", "") or ""
-                if not title or not link:
-                    continue
-                # Try to get a datetime; feedparser puts it in 'published_parsed' or 'updated_parsed'
-                ts = getattr(e, "published_parsed", None) or getattr(e, "updated_parsed", None)
-                epoch = 0
-                if ts:
-                    try:
-                        epoch = int(datetime(*ts[:6]).timestamp())
-                    except Exception:
-                        epoch = 0
-                candidates.append((epoch, title, f"{title} — {link}"))
-        except Exception as ex:
-            print(f"⚠️ Failed to parse {url}: {ex}")
+        fut = futures[url]
+        if not fut.done():
+            print(f"⚠️ {url} missed the {deadline:g}s deadline, using cached entries")
+        elif fut.exception() is not None:
+            print(f"⚠️ Failed to parse {url}: {fut.exception()}")
+        else:
+            cache[url] = fut.result()
+        for epoch, title, link, *key in cache.get(url, {}).get("entries", []):
+            key = key[0] if key else entry_key(link)  # кэш до появления ключей
+            if seen is not None and key in seen:
+                skipped += 1
+                continue
+            candidates.append((epoch, key, title, f"{title} — {link}"))
+
+    try:
+        atomic_write_text(cache_path, json.dumps(cache, ensure_ascii=False, indent=2))
+    except Exception as ex:
+        print(f"⚠️ Failed to write feed cache {cache_path}: {ex}")
 
+    metrics.add(items=len(candidates), skipped=skipped)
+    if skipped:
+        print(f"👀 Skipped {skipped} RSS entries already used by earlier posts")
     if not candidates:
         return "demo keyword", "Headline — Source"
 
     # most recent first
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    _, title, line = candidates[0]
+    epoch, key, title, line = max(candidates, key=lambda x: x[0])
+    if seen is not None:
+        seen.add(key)
     return title, line
@@ -0,0 +1,52 @@
+import os, re
+
+# Templates are compiled once into static segments and {{ slot }} names and
+# cached per path; a changed mtime/size on disk recompiles on next load.
+PLACEHOLDER_RE = re.compile(r"\{\{\s*([\w.]+)\s*\}\}")
+
+_cache = {}  # (path, ensure_slot) -> (mtime_ns, size, Template)
+
+
+class Template:
+    """A template split on {{...}} placeholders, rendered with a single join."""
+
+    def __init__(self, text: str):
+        self.statics = []   # len(slots) + 1 static segments
+        self.slots = []     # (name, raw placeholder text)
+        pos = 0
+        for m in PLACEHOLDER_RE.finditer(text):
+            self.statics.append(text[pos:m.start()])
+            self.slots.append((m.group(1), m.group(0)))
+            pos = m.end()
+        self.statics.append(text[pos:])
+        self.names = {name for name, _ in self.slots}
+
+    def render(self, values: dict) -> str:
+        """Fill slots from values; unknown placeholders are kept verbatim."""
+        out = [self.statics[0]]
+        for (name, raw), static in zip(self.slots, self.statics[1:]):
+            out.append(values.get(name, raw))
+            out.append(static)
+        return "".join(out)
+
+
+def load_template(path, *, ensure_slot=None) -> Template:
+    """
+    Load and compile a template, reusing the cached one while the file is unchanged.
+    ensure_slot=(name, anchor) inserts "{{ name }}\\n" before anchor when the
+    template has no such placeholder.
+    """
+    st = os.stat(path)
+    key = (path, ensure_slot)
+    hit = _cache.get(key)
+    if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2]
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if ensure_slot:
+        name, anchor = ensure_slot
+        if name not in {m.group(1) for m in PLACEHOLDER_RE.finditer(text)}:
+            text = text.replace(anchor, "{{ " + name + " }}\n" + anchor)
+    tpl = Template(text)
+    _cache[key] = (st.st_mtime_ns, st.st_size, tpl)
+    return tpl